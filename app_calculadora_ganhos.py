@@ -1,13 +1,9 @@
 # app_calculadora_ganhos.py — versão final (14/10/2025)
 
 
-import io, base64, unicodedata, re
+import os, base64, time
 from pathlib import Path
-import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
-import networkx as nx
 
 # ====================== CONFIG ======================
 st.set_page_config(page_title="🖩 Calculadora de Ganhos", page_icon="📶", layout="wide")
@@ -15,7 +11,10 @@ st.set_page_config(page_title="🖩 Calculadora de Ganhos", page_icon="📶", la
 # ====================== LOGIN ======================
 def check_password():
     def password_entered():
-        st.session_state["authenticated"] = (st.session_state.get("password") == "claro@123")
+        senha = st.session_state.get("password")
+        senha_admin = os.environ.get("CALC_SENHA_ADMIN")
+        st.session_state["is_admin"] = bool(senha_admin) and senha == senha_admin
+        st.session_state["authenticated"] = senha == "claro@123" or st.session_state["is_admin"]
         if not st.session_state["authenticated"]:
             st.error("Senha incorreta. Tente novamente.")
     if "authenticated" not in st.session_state:
@@ -27,6 +26,27 @@ def check_password():
 
 check_password()
 
+# numpy/pandas e o núcleo só são importados depois do login: na partida a
+# tela de senha aparece sem esperar por eles (python -m calculadora.partida)
+import numpy as np
+import pandas as pd
+
+from calculadora import (
+    URL, CR_SEGMENTO, COLUNAS_LOTE, carregar_base, hash_conteudo,
+    regra_retido_por_tribo, CuboKPI, get_volumes, get_tribo,
+    tx_trn_por_acesso, tx_uu_por_cpf, CacheCoeficientes,
+)
+from calculadora.incerteza import monte_carlo, grade_sensibilidade
+from calculadora.exportacao import FORMATOS, exportar
+from calculadora.fonte import FonteRemota
+from calculadora.graficos import figura_backtest, figura_dispersao, figura_pareto, tabela_pareto
+from calculadora.historico import Backtest
+from calculadora.instrumentacao import Medicao, etapa, memoria_dataframe, memoria_processo
+from calculadora.particoes import BaseParticionada, meses_acrescentados
+
+# medição por etapa desta execução (painel de admin + log em JSON lines)
+medicao = Medicao(memoria=os.environ.get("CALC_PERF_MEMORIA") == "1").ativar()
+
 # ====================== LOGO ======================
 def _find_asset_bytes(name_candidates):
     for d in [Path.cwd(), Path.cwd()/ "assets", Path.cwd()/ "static"]:
@@ -37,146 +57,170 @@ def _find_asset_bytes(name_candidates):
                     return p.read_bytes()
     return None
 
-logo_bytes = _find_asset_bytes(["claro_logo_BF","logo_claro","claro"])
-if logo_bytes:
+@st.cache_resource(show_spinner=False)
+def titulo_html():
+    """Busca do logo + base64 uma vez por processo; devolve o HTML do título."""
+    logo_bytes = _find_asset_bytes(["claro_logo_BF","logo_claro","claro"])
+    if not logo_bytes:
+        return "<h1 style='text-align:center;color:#8B0000;'>🖩 Calculadora de Ganhos</h1>"
     img_b64 = base64.b64encode(logo_bytes).decode()
-    st.markdown(f"""
+    return f"""
         <h1 style='text-align:center;color:#8B0000;font-size:54px;'>
         <img src='data:image/png;base64,{img_b64}' style='height:70px;vertical-align:middle;margin-right:10px'>
-        Calculadora de Ganhos</h1>""", unsafe_allow_html=True)
-else:
-    st.markdown("<h1 style='text-align:center;color:#8B0000;'>🖩 Calculadora de Ganhos</h1>", unsafe_allow_html=True)
-
-# ====================== PARÂMETROS FIXOS ======================
-RETIDO_DICT = {"App":0.9169,"Bot":0.8835,"Web":0.9027}
-CR_SEGMENTO = {"Móvel":0.4947,"Residencial":0.4989}
-DEFAULT_TX_UU_CPF = 12.28
-
-# ====================== NORMALIZAÇÃO ======================
-def normalize_text(s):
-    """Remove acentos, pontuação e prefixos numéricos."""
-    if pd.isna(s):
-        return ""
-    s = str(s).lower().strip()
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"^[0-9.\-\s]+", "", s)       # remove prefixos tipo '7.1 -'
-    s = re.sub(r"[^a-z0-9\s]", " ", s)       # remove pontuação
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
+        Calculadora de Ganhos</h1>"""
+
+st.markdown(titulo_html(), unsafe_allow_html=True)
 
 # ====================== BASE ======================
-URL = "https://raw.githubusercontent.com/gustavo3-freitas/calculadora-ganhos-claro/main/base/Tabela_Performance_v2.xlsx"
-
-st.cache_data.clear()  # limpa cache sempre que roda
-
-@st.cache_data(show_spinner=True)
-def carregar_dados():
-    try:
-        df = pd.read_excel(URL, sheet_name="Tabela Performance")
-    except Exception:
-        st.warning("⚠️ Não foi possível carregar do GitHub. Faça upload manual abaixo.")
-        uploaded = st.file_uploader("📄 Envie a planilha Tabela_Performance_v2.xlsx", type=["xlsx"])
-        if uploaded is not None:
-            df = pd.read_excel(uploaded, sheet_name="Tabela Performance")
+# A planilha vem de uma cópia local (semente: base/ do repositório) revalidada
+# em segundo plano contra o GitHub; o carregamento nunca espera a rede.
+# Com CALC_BASE_DIR o app lê uma base particionada por ANOMES (calculadora.particoes).
+BASE_URL = os.environ.get("CALC_BASE_URL", URL)
+BASE_DIR = os.environ.get("CALC_BASE_DIR")
+
+@st.cache_resource(show_spinner=False)
+def obter_fonte():
+    return FonteRemota(BASE_URL, semente=Path(__file__).resolve().parent / "base" / "Tabela_Performance_v2.xlsx")
+
+@st.cache_resource(show_spinner=True, max_entries=2)
+def carregar_dados(versao):
+    """
+    Base preparada da versão indicada (a versão só serve de chave do cache).
+    Um objeto por processo, compartilhado por todas as sessões sem cópia (as
+    colunas do snapshot são views do Feather mapeado): não alterar no lugar.
+    """
+    if BASE_DIR:
+        return BaseParticionada(BASE_DIR).carregar()
+    return carregar_base(obter_fonte().conteudo())
+
+fonte = obter_fonte()
+if BASE_DIR:
+    with etapa("carregar_dados"):
+        df = carregar_dados(BaseParticionada(BASE_DIR).versao())
+else:
+    if not fonte.disponivel():
+        try:
+            fonte.revalidar()  # sem cópia local nem semente: única vez que a página espera a rede
+        except Exception:
+            st.warning("⚠️ Não foi possível carregar do GitHub. Faça upload manual abaixo.")
+            uploaded = st.file_uploader("📄 Envie a planilha Tabela_Performance_v2.xlsx", type=["xlsx"])
+            if uploaded is None:
+                st.stop()
+            fonte.gravar_upload(uploaded.getvalue())
             st.success("✅ Base carregada com sucesso via upload manual.")
-        else:
-            st.stop()
-
-    df = df[df["TP_META"].astype(str).str.lower().eq("real")].copy()
-    df["VOL_KPI"] = pd.to_numeric(df["VOL_KPI"], errors="coerce").fillna(0)
-    df["ANOMES"] = pd.to_numeric(df["ANOMES"], errors="coerce").astype(int)
-    df["NM_KPI_NORM"] = df["NM_KPI"].map(normalize_text)
-    df["SEGMENTO_NORM"] = df["SEGMENTO"].map(normalize_text)
-    df["SUBCANAL_NORM"] = df["NM_SUBCANAL"].map(normalize_text)
-    df["TORRE_NORM"] = df["NM_TORRE"].map(normalize_text)
-    return df
-
-df = carregar_dados()
+    fonte.revalidar_em_segundo_plano()
+    with etapa("carregar_dados"):
+        df = carregar_dados(fonte.versao or hash_conteudo(fonte.conteudo()))
+
+def _fmt_idade(segundos):
+    if segundos is None:
+        return "idade desconhecida"
+    for limite, unidade in ((86400, "d"), (3600, "h"), (60, "min")):
+        if segundos >= limite:
+            return f"há {int(segundos // limite)} {unidade}"
+    return "agora"
 
 # ====================== HELPERS ======================
 def fmt_int(x):
     try: return f"{np.floor(float(x)+1e-9):,.0f}".replace(",", ".")
     except: return "0"
 
-def regra_retido_por_tribo(tribo):
-    if str(tribo).strip().lower() == "dma":
-        return RETIDO_DICT["Bot"]
-    return RETIDO_DICT.get(tribo, RETIDO_DICT["Web"])
-
-# ====================== FUNÇÕES DE LEITURA ======================
-# ====================== FUNÇÕES DE LEITURA ======================
-def soma_kpi(df_scope, termos):
-    """Soma os valores de VOL_KPI se algum dos termos aparecer no NM_KPI_NORM."""
-    mask = False
-    for termo in termos:
-        mask |= df_scope["NM_KPI_NORM"].str.contains(termo, case=False, na=False)
-    return df_scope.loc[mask, "VOL_KPI"].sum()
-
-
-def get_volumes(df, segmento, subcanal, anomes):
-    """Filtra o dataframe pelo segmento, subcanal e ANOMES, retornando os volumes principais."""
-    seg_key = normalize_text(segmento)
-    sub_key = normalize_text(subcanal)
-    df_f = df[
-        (df["SEGMENTO_NORM"] == seg_key)
-        & (df["SUBCANAL_NORM"] == sub_key)
-        & (df["ANOMES"] == anomes)
-    ].copy()
-
-    vol_71 = soma_kpi(df_f, ["transacao", "transa", "7 1"])
-    vol_41 = soma_kpi(df_f, ["usuario unico", "cpf", "4 1"])
-    vol_6 = soma_kpi(df_f, ["acesso", "6 "])
-
-    return float(vol_71), float(vol_41), float(vol_6)
-
-
-def tx_trn_por_acesso(vol_71, vol_6):
+@st.cache_resource(show_spinner=False)
+def obter_cubo(versao, _df):
+    """Um cubo por versão da base, compartilhado entre reruns e sessões."""
+    return CuboKPI(_df)
+
+@st.cache_resource(show_spinner=False)
+def obter_rotulos_meses(versao, meses):
+    """Rótulo legível ('Ago/2025') → ANOMES, uma vez por versão da base."""
+    meses_map = {1:"Jan",2:"Fev",3:"Mar",4:"Abr",5:"Mai",6:"Jun",7:"Jul",8:"Ago",9:"Set",10:"Out",11:"Nov",12:"Dez"}
+    return {f"{meses_map[int(str(a)[4:])]}/{str(a)[:4]}": a for a in meses}
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_coeficientes():
+    """LRU de premissas por (versão, segmento, ANOMES): novo volume não re-simula."""
+    return CacheCoeficientes(maximo=64)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def gerar_exportacao(chave, formato, _planilhas):
+    """Bytes do download, por (cenário, formato); as tabelas ficam fora do hash."""
+    med = Medicao().ativar()  # roda na thread do download, fora da execução da página
+    dados = exportar(formato, _planilhas)
+    med.gravar(tipo="download", formato=formato, versao=chave[0])
+    return dados
+
+@st.cache_resource(show_spinner=False)
+def obter_cargas():
+    """Etapas da última carga de cada versão da base neste processo (para o painel de admin)."""
+    return {}
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def obter_monte_carlo(chave, _cubo):
+    """Faixas do Monte Carlo por cenário (versão, segmento, ANOMES, volume); é determinístico."""
+    _, segmento, anomes, volume = chave
+    return monte_carlo(_cubo, segmento, anomes, volume)
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def obter_figura(tipo, chave, _construir):
+    """Figura pronta por (tipo, cenário); o cenário determina os dados."""
+    return _construir()
+
+@st.cache_resource(show_spinner=False)
+def obter_backtests_recentes():
+    """{segmento: (origens por mês, Backtest)} do último backtest montado de cada segmento."""
+    return {}
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def obter_backtest(versao, segmento, _cubo, _origens=None):
     """
-    Calcula a taxa de Transações ÷ Acessos, com proteção contra divisões por zero.
-    Mantém valor mínimo de 1.0 para evitar distorções ou erro de divisão.
+    Volumes acumulados de todos os meses do segmento, por versão da base. Na
+    base particionada, se a versão nova só acrescentou meses, estende o
+    backtest anterior em vez de remontá-lo.
     """
-    if vol_71 <= 0 or vol_6 <= 0:
-        
-        return 1.75
-    return max(vol_71 / vol_6, 1.0)
-
-
-
-def tx_uu_por_cpf(vol_71, vol_41):
-    """
-    Calcula a taxa Transações ÷ Usuários Únicos CPF.
-    Aplica fallback padrão (DEFAULT_TX_UU_CPF) caso haja zeros ou valores inválidos.
-    """
-    # Evita divisões por zero e garante valor mínimo
-    if vol_71 <= 0 or vol_41 <= 0:
-        return DEFAULT_TX_UU_CPF
-
-    try:
-        taxa = vol_71 / vol_41
-        # Se taxa for absurda ou negativa, retorna padrão
-        if not np.isfinite(taxa) or taxa <= 0:
-            return DEFAULT_TX_UU_CPF
-        return taxa
-    except ZeroDivisionError:
-        return DEFAULT_TX_UU_CPF
+    recentes = obter_backtests_recentes()
+    bt = None
+    if _origens and segmento in recentes:
+        origens_ant, anterior = recentes[segmento]
+        novos = meses_acrescentados(origens_ant, _origens)
+        if novos is not None:
+            bt = anterior.com_meses(_cubo, novos)
+    if bt is None:
+        bt = Backtest(_cubo, segmento)
+    recentes[segmento] = (_origens, bt)
+    return bt
+
+JANELA_BACKTEST = 3  # meses na suavização das taxas do backtest
+
+cubo_versao = df.attrs.get("versao")
+with etapa("obter_cubo"):
+    cubo = obter_cubo(cubo_versao, df)
+
+# Base e cubo só são construídos na execução que pega o cache vazio (em geral a
+# logo após o login, sem clique em "Calcular"): essa carga vira uma linha própria
+# no log e fica guardada por versão para o painel; o cálculo mede à parte.
+if any(r["etapa"] not in ("carregar_dados", "obter_cubo") for r in medicao.etapas):
+    medicao.gravar(tipo="carga", versao=cubo_versao)
+    obter_cargas()[cubo_versao] = {"ts": medicao.inicio, "etapas": medicao.resumo()}
+    medicao = Medicao(memoria=medicao.memoria).ativar()
 
 # ====================== FILTROS ======================
 st.markdown("## 🔎 Filtros de Cenário")
+if BASE_DIR:
+    st.caption(f"📦 Base versão {df.attrs.get('versao', '?')[:8]} · particionada · "
+               f"{len(BaseParticionada(BASE_DIR).meses())} meses")
+else:
+    st.caption(f"📦 Base versão {df.attrs.get('versao', '?')[:8]} · {fonte.meta.get('origem', 'local')} · "
+               f"{_fmt_idade(fonte.idade())}"
+               + (" · ⚠️ GitHub indisponível, usando a última cópia" if fonte.ultimo_erro else ""))
 c1, c2, c3 = st.columns(3)
-segmentos = sorted(df["SEGMENTO"].dropna().unique().tolist())
-segmento = c1.selectbox("📊 SEGMENTO", segmentos)
-anomes_unicos = sorted(df["ANOMES"].unique())
-meses_map = {1:"Jan",2:"Fev",3:"Mar",4:"Abr",5:"Mai",6:"Jun",7:"Jul",8:"Ago",9:"Set",10:"Out",11:"Nov",12:"Dez"}
-mes_legivel = [f"{meses_map[int(str(a)[4:]) ]}/{str(a)[:4]}" for a in anomes_unicos]
-map_anomes_legivel = dict(zip(mes_legivel, anomes_unicos))
+segmento = c1.selectbox("📊 SEGMENTO", cubo.segmentos)
+map_anomes_legivel = obter_rotulos_meses(cubo_versao, tuple(cubo.meses))
+mes_legivel = list(map_anomes_legivel)
 anomes_legivel = c2.selectbox("🗓️ MÊS", mes_legivel, index=len(mes_legivel)-1)
 anomes_escolhido = map_anomes_legivel[anomes_legivel]
-subcanais = sorted(df.loc[df["SEGMENTO"] == segmento, "NM_SUBCANAL"].dropna().unique())
-subcanal = c3.selectbox("📌 SUBCANAL", subcanais)
+subcanal = c3.selectbox("📌 SUBCANAL", cubo.subcanais(segmento))
 
-df_sub = df[(df["SEGMENTO"] == segmento) & (df["NM_SUBCANAL"] == subcanal) & (df["ANOMES"] == anomes_escolhido)]
-tribo = df_sub["NM_TORRE"].dropna().unique().tolist()[0] if not df_sub.empty else "Indefinido"
+tribo = get_tribo(cubo, segmento, subcanal, anomes_escolhido)
 
 # ====================== INPUT ======================
 st.markdown("---")
@@ -185,7 +229,10 @@ volume_trans = st.number_input("📥 VOLUME DE TRANSAÇÕES ESPERADO", min_value
 
 # ====================== CÁLCULOS ======================
 if st.button("🚀 Calcular Ganhos Potenciais"):
-    vol_71, vol_41, vol_6 = get_volumes(df, segmento, subcanal, anomes_escolhido)
+    import plotly.graph_objects as go  # só carrega quando há gráfico para desenhar
+    chave_cenario = (cubo_versao, segmento, int(anomes_escolhido), float(volume_trans))
+    with etapa("get_volumes"):
+        vol_71, vol_41, vol_6 = get_volumes(cubo, segmento, subcanal, anomes_escolhido)
     tx_trn_acc = tx_trn_por_acesso(vol_71,vol_6)
     tx_uu_cpf = tx_uu_por_cpf(vol_71, vol_41)
     cr_segmento = CR_SEGMENTO.get(segmento, 0.50)
@@ -285,70 +332,94 @@ if st.button("🚀 Calcular Ganhos Potenciais"):
         | % Retido Aplicado | {retido*100:.2f}% |
         """, unsafe_allow_html=True)
 
+    # preenchido no fim da execução, quando todas as etapas já rodaram
+    painel_desempenho = (st.expander("⏱️ Desempenho da Execução", expanded=False)
+                         if st.session_state.get("is_admin") else None)
 
+    # =================== INCERTEZA / SENSIBILIDADE ===================
+    with st.expander("🎲 Incerteza & Sensibilidade", expanded=False):
+        df_mc = obter_monte_carlo(chave_cenario, cubo)
+        linha_mc = df_mc[df_mc["Subcanal"] == subcanal]
+        if not linha_mc.empty:
+            mc = linha_mc.iloc[0]
+            st.markdown(f"""
+            Faixas para **{subcanal}** sorteando as taxas dos **{mc['Meses Histórico']} meses** do histórico,
+            CR ±10% e % Retido ±5%.
+
+            | Indicador | P5 | P50 | P95 |
+            |------|------:|------:|------:|
+            | Volume Ligações Evitadas Humano | {fmt_int(mc['Ligações Evitadas P5'])} | {fmt_int(mc['Ligações Evitadas P50'])} | {fmt_int(mc['Ligações Evitadas P95'])} |
+            | Volume de MAU (CPF) | {fmt_int(mc['MAU P5'])} | {fmt_int(mc['MAU P50'])} | {fmt_int(mc['MAU P95'])} |
+            """)
+        st.dataframe(df_mc, use_container_width=False)
+
+        # grade volume × CR × retido; o slider do Plotly troca o volume sem rerun
+        fatores_vol = [0.5, 0.75, 1.0, 1.25, 1.5]
+        volumes_g = [volume_trans * f for f in fatores_vol]
+        crs_g = np.round(np.linspace(0.8, 1.2, 9) * cr_segmento, 4)
+        retidos_g = np.round(np.linspace(retido * 0.9, min(retido * 1.1, 1.0), 6), 4)
+        with etapa("sensibilidade"):
+            grade = grade_sensibilidade(tx_trn_acc, volumes_g, crs_g, retidos_g)
+            x_lab = [f"{r*100:.1f}%" for r in retidos_g]
+            y_lab = [f"{c*100:.1f}%" for c in crs_g]
+            fig_sens = go.Figure(
+                data=[go.Heatmap(z=grade[2], x=x_lab, y=y_lab, colorscale="Reds",
+                                 zmin=grade.min(), zmax=grade.max(), texttemplate="%{z:.0f}")],
+                frames=[go.Frame(data=[go.Heatmap(z=grade[i], x=x_lab, y=y_lab)], name=str(i))
+                        for i in range(len(volumes_g))])
+            fig_sens.update_layout(
+                title="🌡️ Sensibilidade - Volume Ligações Evitadas Humano",
+                xaxis_title="% Retido Digital 72h", yaxis_title="% Ligação Direcionada Humano",
+                template="plotly_white", height=480,
+                sliders=[dict(active=2, currentvalue=dict(prefix="Volume de Transações: "),
+                              steps=[dict(label=fmt_int(v), method="animate",
+                                          args=[[str(i)], dict(mode="immediate", frame=dict(duration=0, redraw=True))])
+                                     for i, v in enumerate(volumes_g)])])
+            st.plotly_chart(fig_sens, use_container_width=False)
+
+
+
+    # =================== BACKTEST HISTÓRICO ===================
+    with st.expander("📈 Backtest Histórico", expanded=False):
+        with etapa("backtest"):
+            bt = obter_backtest(cubo_versao, segmento, cubo, df.attrs.get("origens"))
+            hist_mes = bt.simular(volume_trans, 1)
+            hist_jan = bt.simular(volume_trans, JANELA_BACKTEST)
+        st.markdown(f"""
+        Todos os subcanais de **{segmento}** em todos os meses da base, com o volume informado.
+        A versão suavizada usa as somas dos últimos **{JANELA_BACKTEST} meses** (Transações ÷ Acessos da janela),
+        menos sensível a um mês atípico na hora de escolher a premissa.
+        """)
+        cr_mes = hist_mes.groupby("Subcanal", sort=False)["Volume CR Evitado"]
+        cr_jan = hist_jan.groupby("Subcanal", sort=False)["Volume CR Evitado"]
+        no_mes = hist_mes["ANOMES"] == anomes_escolhido
+        resumo_bt = pd.DataFrame({
+            "Subcanal": hist_mes.loc[no_mes, "Subcanal"].to_numpy(),
+            "CR Evitado (mês)": hist_mes.loc[no_mes, "Volume CR Evitado"].to_numpy(),
+            f"CR Evitado ({JANELA_BACKTEST}m)": hist_jan.loc[no_mes, "Volume CR Evitado"].to_numpy(),
+            "CV% mensal": (100 * cr_mes.std() / cr_mes.mean()).round(1).to_numpy(),
+            f"CV% {JANELA_BACKTEST}m": (100 * cr_jan.std() / cr_jan.mean()).round(1).to_numpy(),
+        })
+        st.dataframe(resumo_bt, use_container_width=False, hide_index=True)
+        rotulos_meses = {a: r for r, a in map_anomes_legivel.items()}
+        st.plotly_chart(obter_figura("backtest", (chave_cenario, subcanal), lambda: figura_backtest(
+            hist_mes, hist_jan, JANELA_BACKTEST, rotulos_meses, inicial=subcanal)), use_container_width=False)
 
     # =================== PARETO ===================
     st.markdown("---")
     st.markdown("## 📄 Simulação - Todos os Subcanais")
-    resultados = []
-    for sub in sorted(df.loc[df["SEGMENTO"] == segmento, "NM_SUBCANAL"].dropna().unique()):
-        df_i = df[
-            (df["SEGMENTO"] == segmento)
-            & (df["NM_SUBCANAL"] == sub)
-            & (df["ANOMES"] == anomes_escolhido)
-        ]
-        tribo_i = df_i["NM_TORRE"].dropna().unique().tolist()[0] if not df_i.empty else "Indefinido"
-        v71, v41, v6 = get_volumes(df, segmento, sub, anomes_escolhido)
-        tx_i = tx_trn_por_acesso(v71, v6)
-        tx_uu_i = tx_uu_por_cpf(v71, v41)
-        ret_i = regra_retido_por_tribo(tribo_i)
-        cr_i = CR_SEGMENTO.get(segmento, 0.50)
-
-        vol_acc_i = volume_trans / tx_i if tx_i > 0 else 0
-        mau_i = volume_trans / tx_uu_i if tx_uu_i > 0 else 0
-        est_i = np.floor((vol_acc_i * cr_i * ret_i) + 1e-9)
-
-        resultados.append({
-            "Subcanal": sub,
-            "Tribo": tribo_i,
-            "Tx Trans/Acessos": round(tx_i,2),
-            "Tx UU/CPF": round(tx_uu_i,2),
-            "% Retido": round(ret_i*100,2),
-            "% CR": round(cr_i*100,2),
-            "Volume Acessos": int(vol_acc_i),
-            "MAU (CPF)": int(mau_i),
-            "Volume CR Evitado": int(est_i)
-        })
-
-    df_lote = pd.DataFrame(resultados)
+    df_lote = obter_cache_coeficientes().simular(
+        cubo, cubo_versao, segmento, anomes_escolhido, volume_trans)[COLUNAS_LOTE]
     st.dataframe(df_lote, use_container_width=False)
 
     # Pareto
     st.markdown("## 🔎 Análise de Pareto - Potencial de Ganho")
-    df_p = df_lote.sort_values("Volume CR Evitado", ascending=False).reset_index(drop=True)
-    tot = df_p["Volume CR Evitado"].sum()
-    df_p["Acumulado"] = df_p["Volume CR Evitado"].cumsum()
-    df_p["Acumulado %"] = 100 * df_p["Acumulado"] / tot if tot > 0 else 0
-    df_p["Cor"] = np.where(df_p["Acumulado %"] <= 80, "crimson", "lightgray")
-
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=df_p["Subcanal"], y=df_p["Volume CR Evitado"],
-                         name="Volume CR Evitado", marker_color=df_p["Cor"]))
-    fig.add_trace(go.Scatter(x=df_p["Subcanal"], y=df_p["Acumulado %"],
-                             name="Acumulado %", mode="lines+markers",
-                             marker=dict(color="royalblue"), yaxis="y2"))
-    fig.update_layout(
-        title="📈 Pareto - Volume de CR Evitado",
-        xaxis=dict(title="Subcanais"),
-        yaxis=dict(title="Volume CR Evitado"),
-        yaxis2=dict(title="Acumulado %", overlaying="y", side="right", range=[0,100]),
-        legend=dict(x=0.7, y=1.15, orientation="h"),
-        bargap=0.2, margin=dict(l=10,r=10,t=60,b=80)
-    )
-    st.plotly_chart(fig, use_container_width=False)
+    with etapa("pareto"):
+        df_p = tabela_pareto(df_lote)
+        st.plotly_chart(obter_figura("pareto", chave_cenario, lambda: figura_pareto(df_p)), use_container_width=False)
 
     # Top 80%
-    df_top = df_p[df_p["Acumulado %"] <= 80].copy()
+    df_top = df_p[df_p["Acumulado %"] <= 80]
 
         # =================== INSIGHTS ===================
     st.markdown("## 🧠 Insights")
@@ -375,18 +446,20 @@ if st.button("🚀 Calcular Ganhos Potenciais"):
 
         st.dataframe(df_top[colunas_validas], use_container_width=False)
 
-    # =================== DOWNLOAD EXCEL ===================
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as w:
-        df_lote.to_excel(w, sheet_name="Resultados", index=False)
-        df_top.to_excel(w, sheet_name="Top_80_Pareto", index=False)
-
-    st.download_button(
-        "📥 Baixar Excel Completo",
-        buffer.getvalue(),
-        file_name="simulacao_cr.xlsx",
-        mime="application/vnd.ms-excel"
-    )
+    # =================== DOWNLOAD ===================
+    # arquivos gerados só no clique (callable) e guardados por cenário
+    planilhas = {"Resultados": df_lote, "Top_80_Pareto": df_top}
+    d1, d2, d3 = st.columns(3)
+    for col, formato, rotulo in ((d1, "xlsx", "📥 Baixar Excel Completo"),
+                                 (d2, "csv", "📥 CSV"), (d3, "parquet", "📥 Parquet")):
+        nome, mime = FORMATOS[formato]
+        col.download_button(
+            rotulo,
+            lambda formato=formato: gerar_exportacao(chave_cenario, formato, planilhas),
+            file_name=nome,
+            mime=mime,
+            on_click="ignore",
+        )
 
     # =================== ANÁLISE ESTATÍSTICA / DATA SCIENCE ===================
     with st.expander("🔍 Estatística & Ciência de Dadoss", expanded=False):
@@ -431,20 +504,37 @@ if st.button("🚀 Calcular Ganhos Potenciais"):
             """, unsafe_allow_html=True)
     
             # --- Dispersão Acessos × CR Evitado ---
-            fig_scatter = go.Figure()
-            fig_scatter.add_trace(go.Scatter(
-                x=df_lote["Volume Acessos"], y=df_lote["Volume CR Evitado"],
-                mode="markers+text", text=df_lote["Subcanal"],
-                textposition="top center", marker=dict(size=10, color="#b31313", opacity=0.7)
-            ))
-            fig_scatter.update_layout(
-                title="🔬 Relação entre Volume de Acessos e Volume CR Evitado",
-                xaxis_title="Volume de Acessos",
-                yaxis_title="Volume de CR Evitado",
-                template="plotly_white",
-                height=400
-            )
-            st.plotly_chart(fig_scatter, use_container_width=False)
+            with etapa("dispersao"):
+                st.plotly_chart(obter_figura("dispersao", chave_cenario, lambda: figura_dispersao(df_lote)), use_container_width=False)
     
 
 
+
+    # =================== DESEMPENHO (ADMIN) ===================
+    # base e cubo são os objetos compartilhados do processo, não desta sessão
+    memoria = {"base": memoria_dataframe(df), "cubo": memoria_dataframe(cubo.tabela), "rss_mb": memoria_processo()}
+    medicao.gravar(tipo="calculo", versao=cubo_versao, segmento=segmento, subcanal=subcanal,
+                   anomes=int(anomes_escolhido), volume=volume_trans,
+                   revalidacao_s=None if BASE_DIR else fonte.duracao_revalidacao, memoria=memoria)
+    if painel_desempenho is not None:
+        with painel_desempenho:
+            etapas_exec = pd.DataFrame(medicao.resumo())
+            etapas_exec["etapa"] = ["· " * n + e for n, e in zip(etapas_exec["nivel"], etapas_exec["etapa"])]
+            st.dataframe(etapas_exec.drop(columns="nivel"), use_container_width=False, hide_index=True)
+            st.caption("Etapas desta execução; as aninhadas (·) já estão contidas na de cima. "
+                       "Cada cálculo é acrescentado ao log em JSON lines (CALC_PERF_LOG). "
+                       "Pico de memória só com CALC_PERF_MEMORIA=1.")
+            st.dataframe(pd.DataFrame([
+                {"Objeto": "Base", "MB": memoria["base"]["mb"], "Memory-map (MB)": memoria["base"]["mapeado_mb"]},
+                {"Objeto": "Cubo", "MB": memoria["cubo"]["mb"], "Memory-map (MB)": memoria["cubo"]["mapeado_mb"]},
+            ]), use_container_width=False, hide_index=True)
+            st.caption(f"Base e cubo ficam uma vez por processo, compartilhados por todas as sessões "
+                       f"(a parte em memory-map é página do Feather, descartável pelo SO). "
+                       f"RSS do processo: {memoria['rss_mb'] if memoria['rss_mb'] is not None else '?'} MB.")
+            carga = obter_cargas().get(cubo_versao)
+            if carga:
+                etapas_carga = pd.DataFrame(carga["etapas"])
+                etapas_carga["etapa"] = ["· " * n + e for n, e in zip(etapas_carga["nivel"], etapas_carga["etapa"])]
+                st.dataframe(etapas_carga.drop(columns="nivel"), use_container_width=False, hide_index=True)
+                st.caption(f"Carga desta versão da base neste processo ({_fmt_idade(time.time() - carga['ts'])}): "
+                           "download, leitura, normalização e cubo. Também gravada no log (tipo \"carga\").")
@@ -0,0 +1,20 @@
+"""
+Núcleo de cálculo da Calculadora de Ganhos, importável sem Streamlit.
+
+    from calculadora import ler_conteudo, carregar_base, CuboKPI, simular_lote
+    df = carregar_base(ler_conteudo("base/Tabela_Performance_v2.xlsx"))
+    lote = simular_lote(CuboKPI(df), "Móvel", 202508, 1_000)
+"""
+
+from .base import (
+    URL, normalize_text, normalizar_coluna, REGRAS_KPI, FAMILIAS_KPI,
+    classificar_kpi, classificar_coluna_kpi, preparar_base, carregar_base,
+    ler_conteudo, hash_conteudo,
+)
+from .simulacao import (
+    RETIDO_DICT, CR_SEGMENTO, DEFAULT_TX_UU_CPF, COLUNAS_LOTE,
+    regra_retido_por_tribo, soma_kpi, CuboKPI, get_volumes, get_tribo,
+    tx_trn_por_acesso, tx_uu_por_cpf, tx_trn_por_acesso_vet, tx_uu_por_cpf_vet,
+    coeficientes, coeficientes_lote, aplicar_volumes, simular_lote, simular_cenarios,
+    CacheCoeficientes,
+)
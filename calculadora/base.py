@@ -0,0 +1,237 @@
+"""
+Leitura e preparo da base "Tabela Performance": normalização de texto,
+classificação das famílias de KPI e snapshot local em Feather.
+Sem dependência de Streamlit.
+"""
+
+import io, os, hashlib, unicodedata, re, urllib.request
+from array import array
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from .instrumentacao import medido
+
+# ====================== NORMALIZAÇÃO ======================
+def normalize_text(s):
+    """Remove acentos, pontuação e prefixos numéricos."""
+    if pd.isna(s):
+        return ""
+    s = str(s).lower().strip()
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    s = re.sub(r"^[0-9.\-\s]+", "", s)       # remove prefixos tipo '7.1 -'
+    s = re.sub(r"[^a-z0-9\s]", " ", s)       # remove pontuação
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+@medido("normalize_text")
+def normalizar_coluna(serie):
+    """
+    Aplica normalize_text uma vez por valor distinto e devolve um Categorical.
+    As colunas textuais têm poucas centenas de valores distintos, então o custo
+    deixa de crescer com o número de linhas.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    # o código -1 (nulo) cai no último item, que é a string vazia
+    valores = np.array([normalize_text(u) for u in unicos] + [""], dtype=object)
+    return pd.Series(pd.Categorical(valores[codigos]), index=serie.index, name=serie.name)
+
+# ====================== FAMÍLIAS DE KPI ======================
+# Regras declarativas, avaliadas em ordem sobre o NM_KPI_NORM: a primeira que
+# casar define a família. Os padrões usam fronteira de palavra para não casar
+# trechos soltos (o antigo "6 " pegava qualquer nome com um 6 no meio). Os
+# códigos numéricos tipo "7.1 -" já saem no normalize_text, por isso não
+# aparecem aqui.
+REGRAS_KPI = [
+    # família   descrição               padrão (regex)
+    ("vol_71", "Transações",          r"\btransa"),
+    ("vol_41", "Usuários Únicos CPF", r"\busuarios? unicos?\b"),
+    ("vol_41", "Usuários Únicos CPF", r"\bcpf\b"),
+    ("vol_6",  "Acessos",             r"\bacessos?\b"),
+]
+FAMILIAS_KPI = list(dict.fromkeys(f for f, _, _ in REGRAS_KPI))
+
+def classificar_kpi(nome_norm):
+    """Família do KPI (vol_71 / vol_41 / vol_6) ou None se nenhuma regra casar."""
+    for familia, _, padrao in REGRAS_KPI:
+        if re.search(padrao, nome_norm):
+            return familia
+    return None
+
+def classificar_coluna_kpi(serie_kpi_norm):
+    """Classifica cada NM_KPI_NORM distinto uma única vez; devolve Categorical."""
+    cat = serie_kpi_norm.astype("category")
+    mapa = {c: classificar_kpi(c) for c in cat.cat.categories}
+    return pd.Series(pd.Categorical(cat.map(mapa), categories=FAMILIAS_KPI),
+                     index=serie_kpi_norm.index, name="KPI_FAMILIA")
+
+# ====================== SNAPSHOT ======================
+# Cópia local da base já filtrada e normalizada, em Feather (Arrow IPC) sem
+# compressão para permitir memory-map. A chave é o hash do conteúdo da planilha
+# somado à versão do preparo: o parse do xlsx só acontece quando a fonte muda.
+SNAPSHOT_DIR = Path(os.environ.get("CALC_SNAPSHOT_DIR", Path(__file__).resolve().parents[1] / ".cache"))
+SNAPSHOT_VERSAO = "3"  # incrementar quando preparar_base mudar
+
+def hash_conteudo(conteudo):
+    """Hash curto (sha256) do conteúdo bruto da planilha + versão do preparo."""
+    h = hashlib.sha256(conteudo)
+    h.update(SNAPSHOT_VERSAO.encode())
+    return h.hexdigest()[:20]
+
+def _caminho_snapshot(chave):
+    return SNAPSHOT_DIR / f"tabela_performance_{chave}.feather"
+
+def ler_feather(caminho):
+    """Lê um Feather via memory-map (pyarrow); as colunas numéricas não são copiadas."""
+    import pyarrow.feather as feather
+    return feather.read_table(caminho, memory_map=True).to_pandas(split_blocks=True)
+
+@medido("ler_snapshot")
+def ler_snapshot(chave):
+    """Lê o snapshot via memory-map; retorna None se não existir ou estiver corrompido."""
+    p = _caminho_snapshot(chave)
+    if not p.exists():
+        return None
+    try:
+        return ler_feather(p)
+    except (OSError, ValueError):  # arquivo ilegível/truncado (ArrowInvalid é ValueError)
+        return None
+
+def gravar_feather(df, destino):
+    """Feather sem compressão (permite memory-map), gravado de forma atômica."""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix(f".tmp{os.getpid()}")
+    df.reset_index(drop=True).to_feather(tmp, compression="uncompressed")
+    os.replace(tmp, destino)
+
+def gravar_snapshot(df, chave):
+    """Grava o snapshot de forma atômica e remove versões antigas."""
+    try:
+        destino = _caminho_snapshot(chave)
+        gravar_feather(df, destino)
+        for antigo in SNAPSHOT_DIR.glob("tabela_performance_*.feather"):
+            if antigo != destino:
+                antigo.unlink(missing_ok=True)
+    except OSError:
+        pass  # snapshot é otimização: sem disco gravável, segue só em memória
+
+# ====================== BASE ======================
+URL = "https://raw.githubusercontent.com/gustavo3-freitas/calculadora-ganhos-claro/main/base/Tabela_Performance_v2.xlsx"
+
+@medido("download")
+def ler_conteudo(origem=URL, timeout=30):
+    """Bytes da planilha a partir de uma URL http(s) ou de um caminho local."""
+    origem = str(origem)
+    if re.match(r"^https?://", origem):
+        with urllib.request.urlopen(origem, timeout=timeout) as resp:
+            return resp.read()
+    return Path(origem).read_bytes()
+
+ABA_BASE = "Tabela Performance"
+# únicas colunas que o app usa; o resto da planilha nem é materializado
+COLUNAS_TEXTO = ["NM_TORRE", "NM_KPI", "NM_SUBCANAL", "SEGMENTO", "TP_META"]
+COLUNAS_BASE = COLUNAS_TEXTO + ["ANOMES", "VOL_KPI"]
+# erros do Excel e marcadores que o pd.read_excel já tratava como nulo
+NULOS_TEXTO = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A", "#N/A N/A", "#NA",
+               "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA",
+               "NULL", "NaN", "None", "n/a", "nan", "null", ""}
+
+def _para_float(v):
+    if v is None or v == "":
+        return np.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+@medido("ler_planilha")
+def ler_planilha(arquivo, aba=ABA_BASE):
+    """
+    Leitura em streaming (openpyxl read-only) só das COLUNAS_BASE, descartando
+    as linhas que não são TP_META 'real' durante o parse. Texto é codificado em
+    dicionário na hora (códigos int32 + categorias), números vão direto para
+    arrays float64: a memória cresce com as linhas mantidas, não com a aba.
+    `arquivo` pode ser bytes, caminho ou arquivo aberto.
+    """
+    import openpyxl  # ~150 ms de import; só quem parseia o xlsx paga
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = io.BytesIO(arquivo)
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        if aba not in wb.sheetnames:
+            raise ValueError(f"Aba '{aba}' não encontrada na planilha")
+        ws = wb[aba]
+        cabecalho = [None if c is None else str(c).strip() for c in next(ws.iter_rows(max_row=1, values_only=True))]
+        faltando = [c for c in COLUNAS_BASE if c not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas ausentes na aba '{aba}': {', '.join(faltando)}")
+        pos = {c: cabecalho.index(c) for c in COLUNAS_BASE}
+        col_min = min(pos.values())
+        pos = {c: i - col_min for c, i in pos.items()}
+        i_meta, i_anomes, i_vol = pos["TP_META"], pos["ANOMES"], pos["VOL_KPI"]
+        i_texto = [(c, pos[c]) for c in COLUNAS_TEXTO if c != "TP_META"]
+
+        dicionarios = {c: {} for c, _ in i_texto}
+        codigos = {c: array("i") for c, _ in i_texto}
+        anomes, vol = array("d"), array("d")
+        for linha in ws.iter_rows(min_row=2, min_col=col_min + 1, max_col=max(pos.values()) + col_min + 1,
+                                  values_only=True):
+            if str(linha[i_meta]).lower() != "real":
+                continue
+            for c, i in i_texto:
+                v = linha[i]
+                if v is None or (isinstance(v, str) and v in NULOS_TEXTO):
+                    codigos[c].append(-1)
+                else:
+                    d = dicionarios[c]
+                    codigos[c].append(d.setdefault(v if isinstance(v, str) else str(v), len(d)))
+            anomes.append(_para_float(linha[i_anomes]))
+            vol.append(_para_float(linha[i_vol]))
+    finally:
+        wb.close()
+
+    dados = {c: pd.Categorical.from_codes(np.frombuffer(codigos[c], dtype=np.int32), list(dicionarios[c]))
+             for c, _ in i_texto}
+    dados["TP_META"] = pd.Categorical.from_codes(np.zeros(len(vol), dtype=np.int8), ["Real"])
+    dados["ANOMES"] = np.frombuffer(anomes, dtype=np.float64)
+    dados["VOL_KPI"] = np.frombuffer(vol, dtype=np.float64)
+    return pd.DataFrame(dados, columns=COLUNAS_BASE)
+
+@medido("preparar_base")
+def preparar_base(df):
+    """
+    Mantém só linhas 'real', tipa as colunas e calcula as colunas *_NORM e a
+    KPI_FAMILIA. Colunas textuais viram Categorical (menos memória, e as
+    normalizações rodam por valor distinto).
+    """
+    df = df[df["TP_META"].astype(str).str.lower().eq("real")].copy()
+    df["VOL_KPI"] = pd.to_numeric(df["VOL_KPI"], errors="coerce").fillna(0)
+    df["ANOMES"] = pd.to_numeric(df["ANOMES"], errors="coerce").astype(int)
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    df["NM_KPI_NORM"] = normalizar_coluna(df["NM_KPI"])
+    df["SEGMENTO_NORM"] = normalizar_coluna(df["SEGMENTO"])
+    df["SUBCANAL_NORM"] = normalizar_coluna(df["NM_SUBCANAL"])
+    df["TORRE_NORM"] = normalizar_coluna(df["NM_TORRE"])
+    df["KPI_FAMILIA"] = classificar_coluna_kpi(df["NM_KPI_NORM"])
+    return df
+
+def carregar_base(conteudo):
+    """
+    Devolve a base preparada a partir dos bytes do xlsx, usando o snapshot
+    quando possível. Na primeira carga relê o snapshot recém-gravado, para que
+    a base devolvida já seja a versão em memory-map (sem disco, fica a do heap).
+    """
+    chave = hash_conteudo(conteudo)
+    df = ler_snapshot(chave)
+    if df is None:
+        df = preparar_base(ler_planilha(conteudo))
+        gravar_snapshot(df, chave)
+        mapeada = ler_snapshot(chave)
+        if mapeada is not None:
+            df = mapeada
+    df.attrs["versao"] = chave
+    return df
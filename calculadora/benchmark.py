@@ -0,0 +1,197 @@
+"""
+Benchmark das etapas do cálculo sobre bases sintéticas (calculadora.sintetico)
+em várias escalas, com comparação contra uma linha de base gravada.
+
+Para cada escala e etapa mede o tempo (melhor de N repetições) e o pico de
+memória alocada por Python/NumPy durante a etapa (tracemalloc, numa execução
+separada para não distorcer o tempo). Sai com código 1 se alguma etapa passar
+da linha de base além da tolerância mesmo depois de medida de novo.
+
+    python -m calculadora.benchmark                       # escalas 10 e 100, compara
+    python -m calculadora.benchmark --escalas 10 100 1000 --gravar
+"""
+
+import argparse, gc, json, platform, sys, time, tracemalloc
+from pathlib import Path
+import numpy as np
+
+from .base import COLUNAS_BASE, ler_planilha, normalizar_coluna, normalize_text, preparar_base
+from .incerteza import monte_carlo
+from .sintetico import LIMITE_LINHAS_XLSX, SEGMENTOS, gerar_base, gerar_planilha
+from .simulacao import CuboKPI, get_volumes, simular_lote, soma_kpi
+
+BASELINE = Path(__file__).resolve().parents[1] / "benchmarks" / "baseline.json"
+N_CONSULTAS = 10_000   # get_volumes por medição
+N_FILTROS = 20         # recortes soma_kpi (caminho antigo, varre a base) por medição
+MAX_SUBCANAIS_MC = 5_000  # acima disso os histogramas (subcanal × bins) do monte_carlo passam de ~150 MB
+
+def cronometrar(fn, repeticoes=3, minimo_s=1.0, max_repeticoes=50):
+    """
+    (resultado, segundos): melhor tempo de pelo menos `repeticoes` execuções;
+    etapas rápidas repetem até somar `minimo_s` (no máximo `max_repeticoes`).
+    """
+    tempos = []
+    while len(tempos) < repeticoes or (sum(tempos) < minimo_s and len(tempos) < max_repeticoes):
+        gc.collect()
+        t = time.perf_counter()
+        resultado = fn()
+        tempos.append(time.perf_counter() - t)
+    return resultado, min(tempos)
+
+def medir(fn, repeticoes=3):
+    """(resultado, segundos, pico_mb): `cronometrar` + pico do tracemalloc numa execução à parte."""
+    resultado, segundos = cronometrar(fn, repeticoes)
+    del resultado
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, segundos, pico / 2**20
+
+def etapas(escala, semente=0, max_planilha=LIMITE_LINHAS_XLSX):
+    """
+    Gera a base da escala e devolve [(nome, função)] na ordem do app. As etapas
+    seguintes usam o resultado das anteriores (a base preparada, o cubo).
+    """
+    bruto = gerar_base(escala, semente=semente)
+    estado = {"bruto": bruto[COLUNAS_BASE]}
+    lista = []
+    if len(bruto) <= max_planilha:
+        estado["xlsx"] = gerar_planilha(bruto)
+        lista.append(("ler_planilha", lambda: ler_planilha(estado["xlsx"])))
+    del bruto
+
+    rng = np.random.default_rng(semente)
+
+    def consultas(df, n):
+        chaves = df[["SEGMENTO", "NM_SUBCANAL", "ANOMES"]].dropna().drop_duplicates()
+        return chaves.iloc[rng.integers(0, len(chaves), n)].astype(object).to_numpy()
+
+    def preparar():
+        estado["df"] = preparar_base(estado["bruto"])
+        estado["consultas"] = consultas(estado["df"], N_CONSULTAS)
+        return estado["df"]
+
+    def cubo():
+        estado["cubo"] = CuboKPI(estado["df"])
+        return estado["cubo"]
+
+    def volumes():
+        c = estado["cubo"]
+        return [get_volumes(c, s, sub, m) for s, sub, m in estado["consultas"]]
+
+    def filtros():
+        df = estado["df"]
+        saida = []
+        for s, sub, m in estado["consultas"][:N_FILTROS]:
+            recorte = df[(df["SEGMENTO_NORM"] == normalize_text(s)) & (df["SUBCANAL_NORM"] == normalize_text(sub))
+                         & (df["ANOMES"] == m)]
+            saida.append([soma_kpi(recorte, f) for f in CuboKPI.VOLUMES])
+        return saida
+
+    def lote():
+        c = estado["cubo"]
+        return simular_lote(c, c.segmentos, c.meses, 1_000)
+
+    def incerteza():
+        c = estado["cubo"]
+        return monte_carlo(c, c.segmentos[0], c.meses[-1], 1_000, n_sorteios=2_000)
+
+    lista += [
+        ("preparar_base", preparar),
+        ("normalize_text", lambda: normalizar_coluna(estado["bruto"]["NM_SUBCANAL"])),
+        ("cubo", cubo),
+        ("get_volumes", volumes),
+        ("soma_kpi", filtros),
+        ("simular_lote", lote),
+    ]
+    if max(SEGMENTOS.values()) * escala <= MAX_SUBCANAIS_MC:
+        lista.append(("monte_carlo", incerteza))
+    return lista
+
+def rodar(escalas, repeticoes=3, semente=0, max_planilha=LIMITE_LINHAS_XLSX, saida=sys.stderr,
+          baseline=None, tol_tempo=0.30, folga_s=0.005, tentativas=4):
+    """
+    {escala: {etapa: {"segundos", "pico_mb"}}} para as escalas pedidas. Com
+    `baseline`, etapa que sai lenta é cronometrada de novo até `tentativas`
+    vezes (pausas de 1, 2, 4... s), ficando o melhor tempo: máquinas
+    compartilhadas têm surtos de lentidão de vários segundos que o melhor-de-N
+    sozinho não absorve.
+    """
+    resultados = {}
+    for escala in escalas:
+        medidas = resultados[str(escala)] = {}
+        for nome, fn in etapas(escala, semente, max_planilha):
+            _, seg, pico = medir(fn, repeticoes)
+            ref = (baseline or {}).get("escalas", {}).get(str(escala), {}).get(nome)
+            for i in range(tentativas if ref else 0):
+                if not _lento(seg, ref["segundos"], tol_tempo, folga_s):
+                    break
+                time.sleep(2.0 ** i)
+                seg = min(seg, cronometrar(fn, repeticoes)[1])
+            medidas[nome] = {"segundos": round(seg, 5), "pico_mb": round(pico, 2)}
+            print(f"{escala:>6}x  {nome:<15} {seg:>9.4f} s  {pico:>9.1f} MB", file=saida)
+    return resultados
+
+def _lento(segundos, ref, tol, folga):
+    return segundos > ref * (1 + tol) and segundos - ref > folga
+
+def comparar(resultados, baseline, tol_tempo=0.30, tol_memoria=0.20, folga_s=0.005, folga_mb=1.0):
+    """
+    Lista de regressões (texto) em relação à linha de base. Diferenças menores
+    que as folgas absolutas (ruído de medição) são ignoradas.
+    """
+    regressoes = []
+    for escala, medidas in resultados.items():
+        for etapa, m in medidas.items():
+            ref = baseline.get("escalas", {}).get(escala, {}).get(etapa)
+            if ref is None:
+                continue
+            if _lento(m["segundos"], ref["segundos"], tol_tempo, folga_s):
+                regressoes.append(f"{escala}x {etapa}: {m['segundos']:.4f} s (base {ref['segundos']:.4f} s)")
+            if m["pico_mb"] > ref["pico_mb"] * (1 + tol_memoria) and m["pico_mb"] - ref["pico_mb"] > folga_mb:
+                regressoes.append(f"{escala}x {etapa}: {m['pico_mb']:.1f} MB (base {ref['pico_mb']:.1f} MB)")
+    return regressoes
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m calculadora.benchmark", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--escalas", type=int, nargs="+", default=[10, 100])
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--semente", type=int, default=0)
+    ap.add_argument("--max-planilha", type=int, default=100_000,
+                    help="acima desse número de linhas a etapa ler_planilha é pulada (gerar o xlsx é lento)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--gravar", action="store_true", help="grava os resultados como nova linha de base")
+    ap.add_argument("--tol-tempo", type=float, default=0.30)
+    ap.add_argument("--tol-memoria", type=float, default=0.20)
+    args = ap.parse_args(argv)
+
+    try:
+        baseline = json.loads(args.baseline.read_text())
+    except (OSError, ValueError):
+        baseline = None
+    resultados = rodar(args.escalas, args.repeticoes, args.semente, args.max_planilha,
+                       baseline=None if args.gravar else baseline, tol_tempo=args.tol_tempo)
+    if args.gravar:
+        baseline = baseline or {"escalas": {}}
+        baseline["escalas"].update(resultados)
+        baseline["maquina"] = {"python": platform.python_version(), "numpy": np.__version__,
+                               "processador": platform.processor() or platform.machine()}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=1, ensure_ascii=False) + "\n")
+        print(f"linha de base gravada em {args.baseline}", file=sys.stderr)
+        return 0
+
+    if baseline is None:
+        print(f"sem linha de base em {args.baseline} (use --gravar)", file=sys.stderr)
+        return 0
+    regressoes = comparar(resultados, baseline, args.tol_tempo, args.tol_memoria)
+    for r in regressoes:
+        print(f"REGRESSÃO {r}", file=sys.stderr)
+    return 1 if regressoes else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""
+Execução em lote, sem Streamlit, de um arquivo de cenários (CSV ou Parquet)
+com as colunas segmento, subcanal, anomes e volume:
+
+    python -m calculadora cenarios.csv -o resultados.parquet
+
+A entrada é lida em blocos e cada bloco é gravado assim que fica pronto, então
+a memória não cresce com o tamanho do arquivo. Arquivos grandes são divididos
+entre processos (--workers); cada processo carrega a base pelo snapshot local.
+"""
+
+import argparse, csv, os, sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+
+from .base import URL, ler_conteudo, carregar_base
+from .particoes import BaseParticionada
+from .simulacao import CuboKPI, simular_cenarios
+
+COLUNAS_CENARIO = ["segmento", "subcanal", "anomes", "volume"]
+LIMIAR_POOL_BYTES = 20 * 1024 * 1024   # acima disso usa processos por padrão
+
+_CUBO = None  # cubo do processo (principal ou worker)
+
+def _iniciar(origem):
+    """origem: bytes da planilha ou diretório de uma BaseParticionada."""
+    global _CUBO
+    df = BaseParticionada(origem).carregar() if isinstance(origem, str) else carregar_base(origem)
+    _CUBO = CuboKPI(df)
+
+def processar_bloco(bloco):
+    """Simula um bloco de cenários e devolve as colunas de entrada + resultados."""
+    bloco = bloco.rename(columns=str.lower)
+    faltando = [c for c in COLUNAS_CENARIO if c not in bloco.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no arquivo de cenários: {', '.join(faltando)}")
+    res = simular_cenarios(_CUBO, bloco["segmento"].to_numpy(), bloco["subcanal"].to_numpy(),
+                           bloco["anomes"].to_numpy(), pd.to_numeric(bloco["volume"]).to_numpy())
+    res = res.drop(columns=["Segmento", "ANOMES", "Subcanal", "Volume Transações"])
+    return pd.concat([bloco.reset_index(drop=True), res], axis=1)
+
+def ler_em_blocos(caminho, tamanho):
+    """Itera DataFrames de até `tamanho` linhas de um CSV ou Parquet."""
+    caminho = Path(caminho)
+    if caminho.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho):
+            yield lote.to_pandas()
+    else:
+        with open(caminho, newline="", encoding="utf-8-sig") as f:
+            try:
+                sep = csv.Sniffer().sniff(f.readline(), delimiters=",;\t|").delimiter
+            except csv.Error:
+                sep = ","
+        yield from pd.read_csv(caminho, chunksize=tamanho, sep=sep, encoding="utf-8-sig")
+
+class EscritorBlocos:
+    """Grava blocos sucessivos em CSV (append) ou Parquet (ParquetWriter)."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self.parquet = self.caminho.suffix.lower() in (".parquet", ".pq")
+        self._writer = None
+        self.linhas = 0
+
+    def escrever(self, bloco):
+        if self.parquet:
+            import pyarrow as pa, pyarrow.parquet as pq
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.caminho, tabela.schema)
+            self._writer.write_table(tabela.cast(self._writer.schema))
+        else:
+            bloco.to_csv(self.caminho, mode="w" if self.linhas == 0 else "a",
+                         header=self.linhas == 0, index=False)
+        self.linhas += len(bloco)
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def executar(entrada, saida, base=URL, tamanho_bloco=50_000, workers=None):
+    """Processa o arquivo de cenários inteiro; devolve o número de linhas gravadas."""
+    origem = str(base) if Path(str(base)).is_dir() else ler_conteudo(base)
+    _iniciar(origem)  # também grava o snapshot antes de subir os workers
+    if workers is None:
+        workers = (os.cpu_count() or 1) if Path(entrada).stat().st_size > LIMIAR_POOL_BYTES else 0
+
+    escritor = EscritorBlocos(saida)
+    try:
+        if workers <= 1:
+            for bloco in ler_em_blocos(entrada, tamanho_bloco):
+                escritor.escrever(processar_bloco(bloco))
+        else:
+            # no máximo 2 blocos por worker em voo, mantendo a ordem de entrada
+            with ProcessPoolExecutor(workers, initializer=_iniciar, initargs=(origem,)) as pool:
+                pendentes = deque()
+                for bloco in ler_em_blocos(entrada, tamanho_bloco):
+                    pendentes.append(pool.submit(processar_bloco, bloco))
+                    if len(pendentes) >= 2 * workers:
+                        escritor.escrever(pendentes.popleft().result())
+                while pendentes:
+                    escritor.escrever(pendentes.popleft().result())
+    finally:
+        escritor.fechar()
+    return escritor.linhas
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m calculadora",
+                                description="Simula cenários da Calculadora de Ganhos em lote.")
+    p.add_argument("entrada", help="CSV ou Parquet com segmento, subcanal, anomes, volume")
+    p.add_argument("-o", "--saida", required=True, help="arquivo de saída (.csv ou .parquet)")
+    p.add_argument("--base", default=URL, help="planilha Tabela Performance (caminho ou URL) ou diretório de base particionada")
+    p.add_argument("--bloco", type=int, default=50_000, help="linhas por bloco (padrão: 50000)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="processos paralelos (padrão: automático pelo tamanho do arquivo; 0 = sem pool)")
+    args = p.parse_args(argv)
+
+    try:
+        n = executar(args.entrada, args.saida, args.base, args.bloco, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+    print(f"{n} cenários gravados em {args.saida}", file=sys.stderr)
+    return 0
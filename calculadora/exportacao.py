@@ -0,0 +1,71 @@
+"""
+Exportação dos resultados (Excel, CSV, Parquet) em bytes, para download.
+
+O Excel é escrito direto com xlsxwriter em modo `constant_memory`: as linhas
+vão para o disco uma a uma, em ordem, e só a linha corrente (já convertida
+para tipos Python) fica em memória. (O `DataFrame.to_excel` escreve coluna
+por coluna, o que não funciona nesse modo.)
+"""
+
+import io
+
+import pandas as pd
+
+from .instrumentacao import medido
+
+FORMATOS = {
+    "xlsx": ("simulacao_cr.xlsx", "application/vnd.ms-excel"),
+    "csv": ("simulacao_cr.csv", "text/csv"),
+    "parquet": ("simulacao_cr.parquet", "application/vnd.apache.parquet"),
+}
+
+def _linhas_python(df):
+    """
+    Linhas como tuplas de tipos nativos, geradas sob demanda (valor ausente →
+    None, que vira célula vazia). Só as colunas com nulos são verificadas.
+    """
+    com_nulos = [i for i, c in enumerate(df.columns) if df[c].hasnans]
+    for linha in df.itertuples(index=False, name=None):
+        if com_nulos:
+            linha = list(linha)
+            for i in com_nulos:
+                if pd.isna(linha[i]):
+                    linha[i] = None
+        yield linha
+
+def exportar_excel(planilhas):
+    """{nome da aba: DataFrame} → bytes do .xlsx, linha a linha (constant_memory)."""
+    import xlsxwriter
+    buffer = io.BytesIO()
+    wb = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    cabecalho = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for nome, df in planilhas.items():
+        ws = wb.add_worksheet(nome)
+        ws.write_row(0, 0, [str(c) for c in df.columns], cabecalho)
+        for i, linha in enumerate(_linhas_python(df), start=1):
+            ws.write_row(i, 0, linha)
+    wb.close()
+    return buffer.getvalue()
+
+def exportar_csv(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+def exportar_parquet(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+@medido("exportar")
+def exportar(formato, planilhas):
+    """
+    Bytes do arquivo no formato pedido. CSV e Parquet levam só a primeira
+    tabela de `planilhas` (os resultados completos).
+    """
+    if formato == "xlsx":
+        return exportar_excel(planilhas)
+    principal = next(iter(planilhas.values()))
+    if formato == "csv":
+        return exportar_csv(principal)
+    if formato == "parquet":
+        return exportar_parquet(principal)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
@@ -0,0 +1,160 @@
+"""
+Cópia local da planilha remota com revalidação condicional (stale-while-revalidate).
+
+A página sempre lê a última cópia boa em disco; a checagem no servidor usa
+If-None-Match / If-Modified-Since e roda numa thread em segundo plano. Quando
+chega conteúdo novo o arquivo é trocado de forma atômica e a próxima execução
+já enxerga a nova versão.
+"""
+
+import hashlib, json, os, tempfile, threading, time, urllib.error, urllib.request
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from .base import SNAPSHOT_DIR, URL, hash_conteudo
+from .instrumentacao import Medicao, medido
+
+class FonteRemota:
+    """Última cópia boa de `url` em disco + revalidação condicional em background."""
+
+    def __init__(self, url=URL, diretorio=None, semente=None, intervalo=300, timeout=30):
+        self.url = url
+        self.intervalo = intervalo          # segundos entre revalidações
+        self.timeout = timeout
+        self.semente = Path(semente) if semente else None  # cópia inicial (ex.: base/ do repo)
+        self.diretorio = Path(diretorio) if diretorio else SNAPSHOT_DIR / "fonte"
+        nome = hashlib.sha1(url.encode()).hexdigest()[:12]
+        self._arquivo = self.diretorio / f"{nome}.xlsx"
+        self._arquivo_meta = self.diretorio / f"{nome}.json"
+        self._lock = threading.RLock()  # toda escrita em disco (página e thread de revalidação)
+        self._thread = None
+        self.ultimo_erro = None
+        self.duracao_revalidacao = None  # segundos da última revalidação
+        self.meta = self._ler_meta()
+
+    # ---------- leitura local ----------
+    def _ler_meta(self):
+        try:
+            return json.loads(self._arquivo_meta.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _substituir(self, destino, dados):
+        """Grava `dados` num temporário exclusivo do diretório e troca `destino` atomicamente."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, prefix=f"{destino.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, destino)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _gravar_meta(self):
+        self._substituir(self._arquivo_meta, json.dumps(self.meta).encode())
+
+    def _gravar(self, conteudo, **meta):
+        """Troca arquivo e metadados de forma atômica."""
+        with self._lock:
+            self._substituir(self._arquivo, conteudo)
+            self.meta = {"url": self.url, "versao": hash_conteudo(conteudo), "baixado_em": time.time(),
+                         "verificado_em": time.time(), **meta}
+            self._gravar_meta()
+
+    def disponivel(self):
+        """Há cópia local (ou semente para criá-la)?"""
+        return self._arquivo.exists() or bool(self.semente and self.semente.exists())
+
+    def conteudo(self):
+        """Bytes da última cópia boa; cria a partir da semente na primeira vez."""
+        with self._lock:  # a revalidação em segundo plano pode estar gravando a primeira cópia
+            if not self._arquivo.exists():
+                if not (self.semente and self.semente.exists()):
+                    raise FileNotFoundError(f"Sem cópia local de {self.url}")
+                dados = self.semente.read_bytes()
+                # sem ETag: a primeira revalidação baixa o arquivo completo; a idade
+                # exibida é a do arquivo semente, não a da cópia
+                self._gravar(dados, origem="semente", verificado_em=0, baixado_em=self.semente.stat().st_mtime)
+                return dados
+            return self._arquivo.read_bytes()
+
+    def gravar_upload(self, conteudo):
+        """Guarda uma planilha enviada manualmente como última cópia boa."""
+        self._gravar(conteudo, origem="upload")
+
+    @property
+    def versao(self):
+        return self.meta.get("versao")
+
+    def idade(self):
+        """Segundos desde que o conteúdo atual foi obtido (ou desde o Last-Modified)."""
+        ref = self.meta.get("baixado_em")
+        if self.meta.get("last_modified"):
+            try:
+                ref = parsedate_to_datetime(self.meta["last_modified"]).timestamp()
+            except (TypeError, ValueError):
+                pass
+        return None if ref is None else max(time.time() - ref, 0.0)
+
+    # ---------- revalidação ----------
+    @medido("download")
+    def revalidar(self):
+        """
+        Requisição condicional ao servidor. Devolve True se o conteúdo mudou.
+        Erros de rede propagam; a cópia local continua valendo.
+        """
+        # a requisição roda fora do lock: a página nunca espera a rede para ler ou semear a cópia
+        req = urllib.request.Request(self.url)
+        with self._lock:
+            if self._arquivo.exists():
+                if self.meta.get("etag"):
+                    req.add_header("If-None-Match", self.meta["etag"])
+                if self.meta.get("last_modified"):
+                    req.add_header("If-Modified-Since", self.meta["last_modified"])
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                dados = resp.read()
+                etag, modificado = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            with self._lock:
+                self.meta["verificado_em"] = time.time()
+                self._gravar_meta()
+            return False
+
+        with self._lock:
+            mudou = hash_conteudo(dados) != self.versao
+            if mudou:
+                self._gravar(dados, origem="remoto", etag=etag, last_modified=modificado)
+            else:
+                self.meta.update(etag=etag, last_modified=modificado, origem="remoto",
+                                 verificado_em=time.time())
+                self._gravar_meta()
+            return mudou
+
+    def _revalidar_seguro(self):
+        # a thread não herda a medição da página: mede e grava a própria linha
+        med = Medicao().ativar()
+        t = time.perf_counter()
+        mudou = False
+        try:
+            mudou = self.revalidar()
+            self.ultimo_erro = None
+        except Exception as e:  # rede fora: segue com a cópia local e espera o próximo intervalo
+            self.ultimo_erro = e
+            self.meta["verificado_em"] = time.time()
+        self.duracao_revalidacao = time.perf_counter() - t
+        med.gravar(tipo="revalidacao", url=self.url, mudou=mudou,
+                   erro=None if self.ultimo_erro is None else repr(self.ultimo_erro))
+
+    def revalidar_em_segundo_plano(self, forcar=False):
+        """Dispara a revalidação numa thread se o intervalo venceu. Nunca bloqueia."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        if not forcar and time.time() - self.meta.get("verificado_em", 0) < self.intervalo:
+            return None
+        self._thread = threading.Thread(target=self._revalidar_seguro, name="revalida-base", daemon=True)
+        self._thread.start()
+        return self._thread
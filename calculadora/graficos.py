@@ -0,0 +1,114 @@
+"""
+Figuras Plotly do app com tamanho limitado: o Pareto agrega a cauda além do
+top-N numa barra "Outros" e a dispersão troca para WebGL (Scattergl, sem
+rótulo fixo por ponto) acima de um limite de pontos. Com poucos subcanais as
+figuras são as mesmas de sempre.
+
+O plotly é importado dentro das funções, para não pesar na partida do app.
+"""
+
+import numpy as np
+import pandas as pd
+
+TOP_N_PARETO = 40        # barras individuais; o resto vira "Outros"
+LIMITE_WEBGL = 300       # pontos a partir dos quais a dispersão usa Scattergl
+MAX_SUBCANAIS_BACKTEST = 40   # subcanais no seletor do gráfico de tendência
+
+def tabela_pareto(df_lote):
+    """Subcanais em ordem decrescente de CR evitado, com acumulado e cor (top 80%)."""
+    df_p = df_lote.sort_values("Volume CR Evitado", ascending=False).reset_index(drop=True)
+    tot = df_p["Volume CR Evitado"].sum()
+    df_p["Acumulado"] = df_p["Volume CR Evitado"].cumsum()
+    df_p["Acumulado %"] = 100 * df_p["Acumulado"] / tot if tot > 0 else 0
+    df_p["Cor"] = np.where(df_p["Acumulado %"] <= 80, "crimson", "lightgray")
+    return df_p
+
+def figura_pareto(df_p, top_n=TOP_N_PARETO):
+    """Barras do CR evitado + linha do acumulado; a cauda além de top_n vira "Outros"."""
+    import plotly.graph_objects as go
+    barras = df_p[["Subcanal", "Volume CR Evitado", "Acumulado %", "Cor"]]
+    if len(barras) > top_n:
+        cauda = barras.iloc[top_n:]
+        outros = pd.DataFrame({"Subcanal": [f"Outros ({len(cauda)} subcanais)"],
+                               "Volume CR Evitado": [cauda["Volume CR Evitado"].sum()],
+                               "Acumulado %": [cauda["Acumulado %"].iloc[-1]],
+                               "Cor": ["darkgray"]})
+        barras = pd.concat([barras.iloc[:top_n], outros], ignore_index=True)
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=barras["Subcanal"], y=barras["Volume CR Evitado"],
+                         name="Volume CR Evitado", marker_color=barras["Cor"]))
+    fig.add_trace(go.Scatter(x=barras["Subcanal"], y=barras["Acumulado %"],
+                             name="Acumulado %", mode="lines+markers",
+                             marker=dict(color="royalblue"), yaxis="y2"))
+    fig.update_layout(
+        title="📈 Pareto - Volume de CR Evitado",
+        xaxis=dict(title="Subcanais"),
+        yaxis=dict(title="Volume CR Evitado"),
+        yaxis2=dict(title="Acumulado %", overlaying="y", side="right", range=[0,100]),
+        legend=dict(x=0.7, y=1.15, orientation="h"),
+        bargap=0.2, margin=dict(l=10,r=10,t=60,b=80)
+    )
+    return fig
+
+def figura_dispersao(df_lote, limite_webgl=LIMITE_WEBGL):
+    """Acessos × CR evitado; acima de limite_webgl pontos usa Scattergl com o nome só no hover."""
+    import plotly.graph_objects as go
+    marcador = dict(size=10, color="#b31313", opacity=0.7)
+    if len(df_lote) > limite_webgl:
+        traco = go.Scattergl(x=df_lote["Volume Acessos"], y=df_lote["Volume CR Evitado"],
+                             mode="markers", text=df_lote["Subcanal"], hoverinfo="text+x+y",
+                             marker=dict(marcador, size=6))
+    else:
+        traco = go.Scatter(x=df_lote["Volume Acessos"], y=df_lote["Volume CR Evitado"],
+                           mode="markers+text", text=df_lote["Subcanal"],
+                           textposition="top center", marker=marcador)
+    fig = go.Figure(traco)
+    fig.update_layout(
+        title="🔬 Relação entre Volume de Acessos e Volume CR Evitado",
+        xaxis_title="Volume de Acessos",
+        yaxis_title="Volume de CR Evitado",
+        template="plotly_white",
+        height=400
+    )
+    return fig
+
+def figura_backtest(mensal, suavizado, janela, rotulos, inicial=None, max_subcanais=MAX_SUBCANAIS_BACKTEST):
+    """
+    Tendência por subcanal: Tx Trans/Acessos mensal e suavizada (janela) e o
+    CR evitado suavizado (eixo da direita). Um seletor do próprio Plotly troca
+    o subcanal sem rerun; entram os max_subcanais de maior CR evitado médio
+    (e o `inicial`, sempre).
+    """
+    import plotly.graph_objects as go
+    ordem = suavizado.groupby("Subcanal", sort=False)["Volume CR Evitado"].mean().sort_values(ascending=False)
+    subs = list(ordem.index[:max_subcanais])
+    if inicial is not None and inicial in ordem.index and inicial not in subs:
+        subs.append(inicial)
+    inicial = inicial if inicial in subs else (subs[0] if subs else None)
+
+    fig = go.Figure()
+    for s in subs:
+        m, j = mensal[mensal["Subcanal"] == s], suavizado[suavizado["Subcanal"] == s]
+        x = [rotulos.get(a, str(a)) for a in j["ANOMES"]]
+        visivel = s == inicial
+        fig.add_trace(go.Scatter(x=x, y=m["Tx Trans/Acessos"], name="Tx Trans/Acessos (mês)", visible=visivel,
+                                 mode="lines+markers", line=dict(color="lightgray", dash="dot")))
+        fig.add_trace(go.Scatter(x=x, y=j["Tx Trans/Acessos"], name=f"Tx Trans/Acessos ({janela}m)", visible=visivel,
+                                 mode="lines", line=dict(color="#b31313", width=3)))
+        fig.add_trace(go.Scatter(x=x, y=j["Volume CR Evitado"], name=f"CR Evitado ({janela}m)", visible=visivel,
+                                 mode="lines", line=dict(color="royalblue"), yaxis="y2"))
+    botoes = [dict(label=s, method="update",
+                   args=[{"visible": [k // 3 == i for k in range(3 * len(subs))]}, {"title": f"📈 Tendência - {s}"}])
+              for i, s in enumerate(subs)]
+    fig.update_layout(
+        title=f"📈 Tendência - {inicial}",
+        xaxis=dict(title="ANOMES"),
+        yaxis=dict(title="Tx Transações/Acessos"),
+        yaxis2=dict(title="Volume CR Evitado", overlaying="y", side="right"),
+        updatemenus=[dict(buttons=botoes, active=subs.index(inicial) if subs else 0,
+                          x=0, xanchor="left", y=1.18, yanchor="top")],
+        legend=dict(x=0.45, y=1.15, orientation="h"),
+        template="plotly_white", height=460, margin=dict(l=10,r=10,t=90,b=40)
+    )
+    return fig
@@ -0,0 +1,108 @@
+"""
+Backtest histórico de um segmento: tx_trn_acc, tx_uu_cpf e CR evitado para
+todo (subcanal, ANOMES) de uma vez, com suavização por janela móvel.
+
+Os volumes ficam em matrizes subcanal × mês já acumuladas ao longo dos meses;
+a janela de w meses é a diferença de duas colunas acumuladas, então qualquer
+janela sai em O(subcanais × meses) e um mês novo (`adicionar_mes`) só acrescenta
+uma coluna. Com a base particionada, uma versão nova que só acrescenta meses
+estende o backtest anterior (`com_meses`) em vez de remontá-lo. A taxa
+suavizada é a razão das somas da janela (não a média das taxas mensais), com
+os mesmos fallbacks e piso do cálculo pontual; com janela=1 o resultado é o
+de coeficientes_lote mês a mês.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .simulacao import (COLUNAS_COEF, CR_SEGMENTO, CuboKPI, _resultado, regra_retido_por_tribo,
+                        tx_trn_por_acesso_vet, tx_uu_por_cpf_vet)
+
+def _volumes(cubo, segmento, subcanais, meses):
+    """({família: matriz subcanal × mês}, tribos subcanal × mês) lidos do cubo num único reindex."""
+    n_sub, n_mes = len(subcanais), len(meses)
+    idx = pd.MultiIndex.from_arrays([
+        np.full(n_sub * n_mes, cubo.normalizar(segmento), dtype=object),
+        np.repeat(np.array([cubo.normalizar(s) for s in subcanais], dtype=object), n_mes),
+        np.tile(np.array(meses, dtype=np.int64), n_sub),
+    ])
+    vols = cubo.tabela.reindex(idx)
+    matrizes = {c: vols[c].fillna(0.0).to_numpy(dtype=float).reshape(n_sub, n_mes) for c in CuboKPI.VOLUMES}
+    torres = vols["NM_TORRE"].astype(object).where(vols["NM_TORRE"].notna(), "Indefinido")
+    return matrizes, torres.to_numpy().reshape(n_sub, n_mes)
+
+class Backtest:
+    """Volumes acumulados (subcanal × mês) e tribos de um segmento."""
+
+    def __init__(self, cubo, segmento, meses=None):
+        self.segmento = segmento
+        self.subcanais = list(cubo.subcanais(segmento))
+        self.meses = [int(m) for m in (cubo.meses if meses is None else meses)]
+        matrizes, self._tribos = _volumes(cubo, segmento, self.subcanais, self.meses)
+        # acumulado com uma coluna de zeros à esquerda: janela = acum[t+1] - acum[t+1-w]
+        self._acum = {c: np.concatenate([np.zeros((len(self.subcanais), 1)), np.cumsum(m, axis=1)], axis=1)
+                      for c, m in matrizes.items()}
+
+    def adicionar_mes(self, anomes, vol_71, vol_41, vol_6, tribos=None):
+        """
+        Acrescenta um mês (volumes alinhados com self.subcanais). Só a nova
+        coluna do acumulado é calculada; sem `tribos`, repete as do último mês.
+        """
+        anomes = int(anomes)
+        if self.meses and anomes <= self.meses[-1]:
+            raise ValueError(f"ANOMES {anomes} não é posterior a {self.meses[-1]}")
+        for c, v in zip(CuboKPI.VOLUMES, (vol_71, vol_41, vol_6)):
+            novo = self._acum[c][:, -1] + np.asarray(v, dtype=float)
+            self._acum[c] = np.column_stack([self._acum[c], novo])
+        if tribos is None:
+            tribos = self._tribos[:, -1] if self.meses else np.full(len(self.subcanais), "Indefinido", dtype=object)
+        self._tribos = np.column_stack([self._tribos, np.asarray(tribos, dtype=object)])
+        self.meses.append(anomes)
+
+    def com_meses(self, cubo, meses):
+        """
+        Cópia com os `meses` (posteriores aos atuais) lidos de `cubo` e
+        acrescentados via adicionar_mes; este objeto não muda. None se o
+        segmento ganhou ou perdeu subcanais (aí é preciso remontar).
+        """
+        if list(cubo.subcanais(self.segmento)) != self.subcanais:
+            return None
+        novo = copy.copy(self)
+        novo.meses, novo._acum = list(self.meses), dict(self._acum)
+        meses = sorted(int(m) for m in meses)
+        matrizes, tribos = _volumes(cubo, self.segmento, self.subcanais, meses)
+        for j, anomes in enumerate(meses):
+            novo.adicionar_mes(anomes, *(matrizes[c][:, j] for c in CuboKPI.VOLUMES), tribos=tribos[:, j])
+        return novo
+
+    def _janela(self, familia, janela):
+        acum = self._acum[familia]
+        n_mes = acum.shape[1] - 1
+        fim = np.arange(1, n_mes + 1)
+        return acum[:, fim] - acum[:, np.maximum(fim - janela, 0)]
+
+    def coeficientes(self, janela=1):
+        """Premissas (COLUNAS_COEF) de todo (subcanal, ANOMES), taxas suavizadas pela janela."""
+        if janela < 1:
+            raise ValueError("janela deve ser >= 1")
+        v71, v41, v6 = (self._janela(c, janela).ravel() for c in CuboKPI.VOLUMES)
+        n_sub, n_mes = len(self.subcanais), len(self.meses)
+        tribos = self._tribos.ravel()
+        retido = pd.Series(tribos).map({t: regra_retido_por_tribo(t) for t in set(tribos)}).to_numpy(dtype=float)
+        return pd.DataFrame({
+            "Segmento": np.full(n_sub * n_mes, self.segmento, dtype=object),
+            "Subcanal": np.repeat(np.array(self.subcanais, dtype=object), n_mes),
+            "ANOMES": np.tile(np.array(self.meses, dtype=np.int64), n_sub),
+            "Tribo": tribos,
+            "tx_trn_acc": tx_trn_por_acesso_vet(v71, v6),
+            "tx_uu_cpf": tx_uu_por_cpf_vet(v71, v41),
+            "retido": retido,
+            "cr": np.full(n_sub * n_mes, CR_SEGMENTO.get(self.segmento, 0.50)),
+        }, columns=COLUNAS_COEF)
+
+    def simular(self, volume, janela=1):
+        """Resultado do lote para todo (subcanal, ANOMES) com o mesmo volume."""
+        coef = self.coeficientes(janela)
+        return _resultado(coef, np.full(len(coef), float(volume)))
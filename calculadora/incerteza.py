@@ -0,0 +1,149 @@
+"""
+Modo de incerteza: Monte Carlo sobre a variação histórica das taxas e grade
+de sensibilidade volume × CR × %retido.
+
+As taxas (tx_trn_acc, tx_uu_cpf) são sorteadas em conjunto a partir dos ANOMES
+históricos de cada subcanal (mesmo mês para as duas, preservando a correlação);
+CR e %retido variam uniformemente em torno do valor da premissa. O sorteio é
+feito em blocos e acumulado em histogramas por subcanal com limites fixos, de
+modo que a memória não depende do número de sorteios.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .base import normalize_text
+from .instrumentacao import medido
+from .simulacao import (CR_SEGMENTO, CuboKPI, regra_retido_por_tribo,
+                        tx_trn_por_acesso_vet, tx_uu_por_cpf_vet)
+
+def _matrizes_historico(cubo, segmento, subcanais):
+    """
+    (tx_trn_acc, tx_uu_cpf, anomes, n_meses): matrizes subcanal × mês com os
+    meses válidos (volume de transações > 0) à esquerda, em ordem, e o resto
+    completado com o último valor válido. Um único reindex do cubo, como no
+    Backtest; subcanal sem histórico fica com os fallbacks e n_meses = 0.
+    """
+    meses = np.array(cubo.meses, dtype=np.int64)
+    n_sub, n_mes = len(subcanais), len(meses)
+    idx = pd.MultiIndex.from_arrays([
+        np.full(n_sub * n_mes, normalize_text(segmento), dtype=object),
+        np.repeat(np.array([cubo.normalizar(s) for s in subcanais], dtype=object), n_mes),
+        np.tile(meses, n_sub),
+    ])
+    vols = cubo.tabela.reindex(idx, columns=CuboKPI.VOLUMES).fillna(0.0).to_numpy(dtype=float)
+    v71, v41, v6 = (vols[:, i].reshape(n_sub, n_mes) for i in range(3))
+
+    valido = v71 > 0
+    n_meses = valido.sum(axis=1)
+    ordem = np.argsort(~valido, axis=1, kind="stable")          # válidos primeiro, em ordem
+    ultimo = np.maximum(n_meses - 1, 0)[:, None]
+    pos = np.minimum(np.arange(max(n_mes, 1))[None, :], ultimo)  # repete o último válido
+    col = np.take_along_axis(ordem, pos, axis=1) if n_mes else np.zeros((n_sub, 1), dtype=np.int64)
+    linhas = np.arange(n_sub)[:, None]
+    sem = (n_meses == 0)[:, None]
+    v71, v41, v6 = (np.where(sem, 0.0, m[linhas, col]) if n_mes else np.zeros((n_sub, 1)) for m in (v71, v41, v6))
+    anomes = meses[col] if n_mes else np.zeros((n_sub, 1), dtype=np.int64)
+    return tx_trn_por_acesso_vet(v71, v6), tx_uu_por_cpf_vet(v71, v41), anomes, n_meses
+
+def historico_taxas(cubo, segmento, subcanais=None):
+    """
+    Taxas históricas por subcanal: dict {subcanal: (tx_trn_acc[], tx_uu_cpf[], anomes[])}.
+    Só entram meses com volume de transações; subcanal sem histórico recebe os
+    fallbacks (1.75 / DEFAULT_TX_UU_CPF) como único ponto.
+    """
+    subcanais = cubo.subcanais(segmento) if subcanais is None else list(subcanais)
+    tx, uu, anomes, n_meses = _matrizes_historico(cubo, segmento, subcanais)
+    return {s: (tx[i, :max(n, 1)], uu[i, :max(n, 1)], anomes[i, :n])
+            for i, (s, n) in enumerate(zip(subcanais, n_meses))}
+
+def _quantis(hist, lo, hi, qs):
+    """Quantis aproximados (centro do bin) de histogramas por linha."""
+    n_bins = hist.shape[1]
+    cdf = np.cumsum(hist, axis=1) / np.maximum(hist.sum(axis=1, keepdims=True), 1)
+    largura = (hi - lo) / n_bins
+    return {q: lo + ((cdf < q / 100).sum(axis=1) + 0.5) * largura for q in qs}
+
+@medido("monte_carlo")
+def monte_carlo(cubo, segmento, anomes, volume, n_sorteios=20_000, var_cr=0.10, var_retido=0.05,
+                percentis=(5, 50, 95), semente=42, bloco=4_096, bins=2_048, max_elementos=2**18):
+    """
+    Faixas de percentis de "Volume Ligações Evitadas Humano" e MAU por subcanal.
+
+    n_sorteios é por subcanal. var_cr / var_retido são meias-larguras relativas
+    das faixas uniformes (0.10 = ±10%); o %retido é limitado a 100%. A tribo
+    (e portanto o %retido central) vem do ANOMES escolhido, como no cálculo
+    pontual. Resultado determinístico para a mesma semente.
+
+    Cada bloco sorteia no máximo `max_elementos` valores (subcanais × sorteios),
+    então a memória de trabalho não cresce com o número de subcanais.
+    """
+    subs = cubo.subcanais(segmento)
+    colunas = (["Subcanal", "Tribo", "Meses Histórico"]
+               + [f"Ligações Evitadas P{q}" for q in percentis] + ["Ligações Evitadas Média"]
+               + [f"MAU P{q}" for q in percentis] + ["MAU Média"])
+    if not subs:
+        return pd.DataFrame(columns=colunas)
+
+    tx_m, uu_m, _, n_hist = _matrizes_historico(cubo, segmento, subs)
+    n_sub = len(subs)
+    n_meses = np.maximum(n_hist, 1)
+
+    tribos = [cubo.tribo(segmento, s, anomes) for s in subs]
+    ret_c = np.array([regra_retido_por_tribo(t) for t in tribos])
+    cr_c = CR_SEGMENTO.get(segmento, 0.50)
+    ret_lo, ret_hi = ret_c * (1 - var_retido), np.minimum(ret_c * (1 + var_retido), 1.0)
+    cr_lo, cr_hi = cr_c * (1 - var_cr), cr_c * (1 + var_cr)
+    v = float(volume)
+
+    # limites exatos de cada saída → histogramas de largura fixa
+    ev_lo = v / tx_m.max(axis=1) * cr_lo * ret_lo
+    ev_hi = v / tx_m.min(axis=1) * cr_hi * ret_hi * (1 + 1e-9) + 1e-9
+    mau_lo = v / uu_m.max(axis=1)
+    mau_hi = v / uu_m.min(axis=1) * (1 + 1e-9) + 1e-9
+    h_ev = np.zeros(n_sub * bins, dtype=np.int32); h_mau = np.zeros(n_sub * bins, dtype=np.int32)
+    soma_ev = np.zeros(n_sub); soma_mau = np.zeros(n_sub)
+    offset = (np.arange(n_sub) * bins)[:, None]
+
+    rng = np.random.default_rng(semente)
+    bloco = max(1, min(bloco, max_elementos // n_sub))
+    feitos = 0
+    while feitos < n_sorteios:
+        b = min(bloco, n_sorteios - feitos)
+        mes = (rng.random((n_sub, b)) * n_meses[:, None]).astype(np.int64)
+        tx = np.take_along_axis(tx_m, mes, axis=1)
+        uu = np.take_along_axis(uu_m, mes, axis=1)
+        cr = rng.uniform(cr_lo, cr_hi, (n_sub, b))
+        ret = ret_lo[:, None] + rng.random((n_sub, b)) * (ret_hi - ret_lo)[:, None]
+
+        ev = v / tx * cr * ret
+        mau = v / uu
+        soma_ev += ev.sum(axis=1); soma_mau += mau.sum(axis=1)
+        for valores, lo, hi, h in ((ev, ev_lo, ev_hi, h_ev), (mau, mau_lo, mau_hi, h_mau)):
+            escala = bins / np.maximum(hi - lo, 1e-12)
+            idx = np.clip(((valores - lo[:, None]) * escala[:, None]).astype(np.int64), 0, bins - 1)
+            h += np.bincount((idx + offset).ravel(), minlength=n_sub * bins)
+        feitos += b
+
+    q_ev = _quantis(h_ev.reshape(n_sub, bins), ev_lo, ev_hi, percentis)
+    q_mau = _quantis(h_mau.reshape(n_sub, bins), mau_lo, mau_hi, percentis)
+    dados = {"Subcanal": subs, "Tribo": tribos,
+             "Meses Histórico": n_hist}
+    for q in percentis:
+        dados[f"Ligações Evitadas P{q}"] = np.floor(q_ev[q] + 1e-9).astype(np.int64)
+    dados["Ligações Evitadas Média"] = np.floor(soma_ev / n_sorteios + 1e-9).astype(np.int64)
+    for q in percentis:
+        dados[f"MAU P{q}"] = q_mau[q].astype(np.int64)
+    dados["MAU Média"] = (soma_mau / n_sorteios).astype(np.int64)
+    return pd.DataFrame(dados, columns=colunas)
+
+def grade_sensibilidade(tx_trn_acc, volumes, crs, retidos):
+    """
+    Ligações evitadas (com piso) para cada combinação volume × CR × %retido,
+    dada a taxa Transações ÷ Acessos. Devolve array (volumes, crs, retidos).
+    """
+    v = np.asarray(volumes, dtype=float)[:, None, None]
+    cr = np.asarray(crs, dtype=float)[None, :, None]
+    ret = np.asarray(retidos, dtype=float)[None, None, :]
+    acessos = v / tx_trn_acc if tx_trn_acc > 0 else np.zeros_like(v)
+    return np.floor(acessos * cr * ret + 1e-9)
@@ -0,0 +1,156 @@
+"""
+Medição leve de tempo (e, opcionalmente, pico de memória) por etapa.
+
+Uma `Medicao` ativa no contexto atual recebe as etapas abertas com `etapa()`
+ou pelas funções decoradas com `@medido`; sem medição ativa as duas viram
+no-op (custo de uma consulta a ContextVar). Etapas podem ser aninhadas. O
+pico de memória vem do tracemalloc, que é global ao processo e deixa o código
+mais lento: por isso é opcional.
+
+    med = Medicao(memoria=True).ativar()
+    with etapa("simular_lote"):
+        ...
+    med.gravar("desempenho.jsonl", segmento="Móvel")
+
+`memoria_dataframe` e `memoria_processo` dão a contabilidade de memória dos
+objetos compartilhados entre sessões (quanto é heap e quanto é memory-map).
+"""
+
+import functools, json, os, threading, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+import numpy as np
+
+_atual = ContextVar("medicao", default=None)
+_lock_log = threading.Lock()
+
+class Medicao:
+    """Etapas medidas de uma execução: nome, nível, segundos e pico (MB)."""
+
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.etapas = []
+        self._pilha = []      # picos absolutos já vistos pelas etapas abertas
+        self.inicio = time.time()
+
+    def ativar(self):
+        """Torna esta a medição do contexto atual (a thread do script, no Streamlit)."""
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _atual.set(self)
+        return self
+
+    @contextmanager
+    def etapa(self, nome):
+        registro = {"etapa": nome, "nivel": len(self._pilha)}
+        self.etapas.append(registro)
+        memoria = self.memoria and tracemalloc.is_tracing()
+        if memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            if self._pilha:  # o reset abaixo apagaria o pico da etapa de fora
+                self._pilha[-1] = max(self._pilha[-1], pico)
+            tracemalloc.reset_peak()
+            self._pilha.append(atual)
+            base = atual
+        else:
+            self._pilha.append(0)
+        t = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["segundos"] = round(time.perf_counter() - t, 6)
+            pico = self._pilha.pop()
+            if memoria:
+                pico = max(pico, tracemalloc.get_traced_memory()[1])
+                registro["pico_mb"] = round((pico - base) / 2**20, 3)
+                if self._pilha:
+                    self._pilha[-1] = max(self._pilha[-1], pico)
+
+    def resumo(self):
+        """Etapas agregadas por nome (na ordem da primeira ocorrência)."""
+        agregado = {}
+        for r in self.etapas:
+            a = agregado.setdefault(r["etapa"], {"etapa": r["etapa"], "nivel": r["nivel"], "chamadas": 0, "segundos": 0.0})
+            a["chamadas"] += 1
+            a["segundos"] = round(a["segundos"] + r.get("segundos", 0.0), 6)
+            if "pico_mb" in r:
+                a["pico_mb"] = max(a.get("pico_mb", 0.0), r["pico_mb"])
+        return list(agregado.values())
+
+    def gravar(self, caminho=None, **extra):
+        """Acrescenta uma linha JSON com o resumo ao log. Falha de disco é ignorada."""
+        if caminho is None:
+            from .base import SNAPSHOT_DIR  # base importa este módulo
+            caminho = os.environ.get("CALC_PERF_LOG", SNAPSHOT_DIR / "desempenho.jsonl")
+        caminho = Path(caminho)
+        linha = json.dumps({"ts": round(self.inicio, 3), **extra, "etapas": self.resumo()},
+                           ensure_ascii=False, default=str)
+        try:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            with _lock_log, open(caminho, "a", encoding="utf-8") as f:
+                f.write(linha + "\n")
+        except OSError:
+            pass
+
+# ====================== MEMÓRIA ======================
+def _faixas_mapeadas(sufixo=".feather"):
+    """Faixas de endereço [ini, fim) dos arquivos `sufixo` mapeados neste processo (só Linux)."""
+    faixas = []
+    try:
+        with open("/proc/self/maps") as f:
+            for linha in f:
+                partes = linha.split()
+                if len(partes) >= 6 and partes[-1].endswith(sufixo):
+                    ini, fim = partes[0].split("-")
+                    faixas.append((int(ini, 16), int(fim, 16)))
+    except OSError:
+        pass
+    return faixas
+
+def _arrays(serie):
+    valores = serie.array
+    if hasattr(valores, "codes"):  # Categorical: códigos + dicionário
+        return [valores.codes, valores.categories.to_numpy()]
+    return [np.asarray(valores)]
+
+def memoria_dataframe(df):
+    """
+    {"mb", "mapeado_mb"}: bytes do DataFrame (deep) e quanto disso são
+    páginas de um Feather mapeado, que o SO compartilha e pode descartar.
+    """
+    faixas = _faixas_mapeadas()
+    mapeado = 0
+    for col in df.columns:
+        for a in _arrays(df[col]):
+            endereco = a.__array_interface__["data"][0]
+            if a.dtype != object and any(ini <= endereco < fim for ini, fim in faixas):
+                mapeado += a.nbytes
+    return {"mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 3), "mapeado_mb": round(mapeado / 2**20, 3)}
+
+def memoria_processo():
+    """RSS atual do processo em MB (None fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def etapa(nome):
+    """Etapa na medição ativa, ou contexto vazio se não houver."""
+    med = _atual.get()
+    return nullcontext() if med is None else med.etapa(nome)
+
+def medido(nome=None):
+    """Decorador: mede cada chamada da função como uma etapa."""
+    def decorar(fn):
+        rotulo = nome or fn.__name__
+        @functools.wraps(fn)
+        def envolvida(*args, **kwargs):
+            med = _atual.get()
+            if med is None:
+                return fn(*args, **kwargs)
+            with med.etapa(rotulo):
+                return fn(*args, **kwargs)
+        return envolvida
+    return decorar
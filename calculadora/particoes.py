@@ -0,0 +1,162 @@
+"""
+Base particionada por ANOMES, montada a partir de qualquer número de planilhas
+(mensais, parciais ou completas).
+
+Cada mês vira um Feather em `<diretório>/anomes=AAAAMM.feather` já preparado
+(colunas *_NORM e KPI_FAMILIA). Ao ingerir uma planilha só as partições dos
+meses que ela contém são regravadas; planilhas já ingeridas (mesmo hash) são
+ignoradas. Consultas por mês leem só a partição do mês.
+
+Deduplicação: a chave é (ANOMES, SEGMENTO, NM_SUBCANAL, NM_KPI, TP_META),
+comparada pelas formas normalizadas; para o NM_KPI vale a família (KPI_FAMILIA)
+quando existe, já que versões da planilha nomeiam o mesmo KPI de jeitos
+diferentes ("acessos" × "6 - Acessos Usuários"). Uma mesma chave tem várias
+linhas legítimas dentro da planilha (uma por categoria), então a deduplicação
+é por grupo: a planilha ingerida por último substitui todas as linhas da chave.
+
+O manifesto guarda a versão do preparo (SNAPSHOT_VERSAO) com que as partições
+foram gravadas; se o preparar_base mudou, carregar e ingerir recusam o
+diretório em vez de servir ou misturar colunas *_NORM/KPI_FAMILIA antigas.
+
+    python -m calculadora.particoes .cache/particoes base/Tabela_Performance_v2.xlsx novo_mes.xlsx
+"""
+
+import hashlib, json, os, sys, time
+from pathlib import Path
+import pandas as pd
+
+from .base import (FAMILIAS_KPI, SNAPSHOT_DIR, SNAPSHOT_VERSAO, gravar_feather,
+                   hash_conteudo, ler_feather, ler_planilha, preparar_base)
+
+CHAVE_DEDUP = ["ANOMES", "SEGMENTO_NORM", "SUBCANAL_NORM", "NM_KPI_NORM", "TP_META"]  # NM_KPI_NORM → família
+
+class BaseParticionada:
+    """Diretório de partições mensais + manifesto das planilhas ingeridas."""
+
+    def __init__(self, diretorio=None):
+        self.diretorio = Path(diretorio) if diretorio else SNAPSHOT_DIR / "particoes"
+        self._arquivo_manifesto = self.diretorio / "manifesto.json"
+        try:
+            self.manifesto = json.loads(self._arquivo_manifesto.read_text())
+        except (OSError, ValueError):
+            self.manifesto = {"versao_preparo": SNAPSHOT_VERSAO, "arquivos": {}, "particoes": {}}
+
+    def _verificar_preparo(self):
+        """Erro se há partições gravadas com outra versão do preparar_base."""
+        versao = self.manifesto.get("versao_preparo")
+        if self.manifesto["particoes"] and versao != SNAPSHOT_VERSAO:
+            raise ValueError(f"Partições em {self.diretorio} preparadas com a versão {versao} do preparo "
+                             f"(atual: {SNAPSHOT_VERSAO}); reingira as planilhas num diretório novo")
+
+    def _caminho(self, anomes):
+        return self.diretorio / f"anomes={int(anomes)}.feather"
+
+    def _salvar_manifesto(self):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        tmp = self._arquivo_manifesto.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(json.dumps(self.manifesto, indent=1, ensure_ascii=False))
+        os.replace(tmp, self._arquivo_manifesto)
+
+    def meses(self):
+        """ANOMES disponíveis, em ordem."""
+        return sorted(int(m) for m in self.manifesto["particoes"])
+
+    def origens(self):
+        """{ANOMES: hashes das planilhas que compõem a partição}: identifica o conteúdo de cada mês."""
+        return {int(m): tuple(p["origens"]) for m, p in self.manifesto["particoes"].items()}
+
+    def versao(self):
+        """Hash do estado das partições (muda a cada ingestão que altera dados)."""
+        estado = json.dumps({m: p["origens"] for m, p in sorted(self.manifesto["particoes"].items())})
+        return hashlib.sha256(estado.encode()).hexdigest()[:20]
+
+    # ---------- ingestão ----------
+    def ingerir(self, arquivo, nome=None):
+        """
+        Ingere uma planilha (caminho ou bytes). Devolve os ANOMES regravados;
+        lista vazia se o mesmo conteúdo já tinha sido ingerido.
+        """
+        if isinstance(arquivo, (bytes, bytearray)):
+            conteudo, nome = bytes(arquivo), nome or "upload"
+        else:
+            conteudo, nome = Path(arquivo).read_bytes(), nome or Path(arquivo).name
+        h = hash_conteudo(conteudo)
+        self._verificar_preparo()
+        if h in self.manifesto["arquivos"]:
+            return []
+
+        novo = preparar_base(ler_planilha(conteudo))
+        alterados = []
+        for anomes, parte in novo.groupby("ANOMES", sort=True):
+            atual = self.ler_mes(anomes)
+            if atual is not None:
+                substituidas = _chaves(atual).isin(_chaves(parte))
+                parte = pd.concat([atual[~substituidas], parte], ignore_index=True)
+            parte = _recategorizar(parte)
+            gravar_feather(parte, self._caminho(anomes))
+            info = self.manifesto["particoes"].setdefault(str(int(anomes)), {"origens": []})
+            info.update(linhas=len(parte), atualizado_em=time.time())
+            info["origens"].append(h)
+            alterados.append(int(anomes))
+
+        self.manifesto["versao_preparo"] = SNAPSHOT_VERSAO
+        self.manifesto["arquivos"][h] = {"nome": nome, "meses": alterados, "ingerido_em": time.time()}
+        self._salvar_manifesto()
+        return alterados
+
+    # ---------- consulta ----------
+    def ler_mes(self, anomes):
+        """Partição de um ANOMES (memory-map) ou None."""
+        p = self._caminho(anomes)
+        return ler_feather(p) if p.exists() else None
+
+    def carregar(self, meses=None):
+        """Base preparada com os meses pedidos (padrão: todos), pronta para o CuboKPI."""
+        self._verificar_preparo()
+        meses = self.meses() if meses is None else [int(m) for m in meses]
+        partes = [p for p in (self.ler_mes(m) for m in meses) if p is not None]
+        if not partes:
+            raise FileNotFoundError(f"Nenhuma partição em {self.diretorio}")
+        df = _recategorizar(pd.concat(partes, ignore_index=True)) if len(partes) > 1 else partes[0]
+        df.attrs["versao"] = self.versao()
+        df.attrs["origens"] = {m: o for m, o in self.origens().items() if m in meses}
+        return df
+
+def meses_acrescentados(anterior, atual):
+    """
+    ANOMES novos de `atual` em relação a `anterior` (dicionários de origens),
+    se a mudança foi só acrescentar meses depois do último; None caso contrário.
+    """
+    if not anterior or any(atual.get(m) != o for m, o in anterior.items()):
+        return None
+    novos = sorted(m for m in atual if m not in anterior)
+    return novos if all(m > max(anterior) for m in novos) else None
+
+def _chaves(df):
+    kpi = df["KPI_FAMILIA"].astype(object).where(df["KPI_FAMILIA"].notna(), df["NM_KPI_NORM"].astype(object))
+    colunas = {c: df[c].astype(object) for c in CHAVE_DEDUP if c != "ANOMES"}
+    colunas.update(ANOMES=df["ANOMES"], NM_KPI_NORM=kpi)
+    return pd.MultiIndex.from_arrays([colunas[c] for c in CHAVE_DEDUP])
+
+def _recategorizar(df):
+    """Partições têm dicionários próprios; ao juntar, volta tudo para Categorical."""
+    for col in df.columns:
+        if col == "KPI_FAMILIA":
+            df[col] = df[col].astype(pd.CategoricalDtype(FAMILIAS_KPI))
+        elif df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print("uso: python -m calculadora.particoes DIRETORIO PLANILHA [PLANILHA ...]", file=sys.stderr)
+        return 2
+    base = BaseParticionada(argv[0])
+    for arquivo in argv[1:]:
+        meses = base.ingerir(arquivo)
+        print(f"{arquivo}: {', '.join(map(str, meses)) if meses else 'já ingerida'}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""
+Relatório de partida do app: quanto custam os imports de nível de módulo de
+app_calculadora_ganhos.py num interpretador novo, separados entre os que
+rodam antes da tela de senha e os que rodam depois do login. O import do
+streamlit é o piso de qualquer página e não depende do app: ele é mostrado à
+parte e os orçamentos valem só para os imports do próprio app.
+
+Os imports são lidos do próprio script (AST), então o relatório acompanha o
+app sem manutenção; imports dentro de blocos (ex.: o plotly, carregado só
+quando há gráfico) ficam de fora da partida. Sai com código 1 se algum
+orçamento estourar ou se um módulo proibido for carregado na partida.
+
+    python -m calculadora.partida
+    python -m calculadora.partida --orcamento-senha 0.2 --orcamento 1.5 --detalhe 15
+"""
+
+import argparse, ast, json, subprocess, sys, time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parents[1] / "app_calculadora_ganhos.py"
+PROIBIDOS = ("plotly", "networkx", "openpyxl")   # desnecessários até o primeiro gráfico / parse
+MARCO_SENHA = "check_password"
+
+_DRIVER = """
+import json, sys, time
+saida, novos = [], {}
+for fase, instrucao in json.loads(sys.argv[1]):
+    antes = set(sys.modules)
+    t = time.perf_counter()
+    exec(instrucao, {})
+    saida.append([fase, instrucao, time.perf_counter() - t])
+    novos[instrucao] = sorted(set(sys.modules) - antes)
+print(json.dumps({"imports": saida, "novos": novos}))
+"""
+
+def imports_de_partida(caminho=APP):
+    """[(fase, instrução)] dos imports de nível de módulo; fase é 'senha' ou 'login'."""
+    fonte = Path(caminho).read_text(encoding="utf-8")
+    fase, saida = "senha", []
+    for no in ast.parse(fonte).body:
+        if isinstance(no, (ast.Import, ast.ImportFrom)):
+            saida.append((fase, ast.get_source_segment(fonte, no)))
+        elif (isinstance(no, ast.Expr) and isinstance(no.value, ast.Call)
+              and getattr(no.value.func, "id", None) == MARCO_SENHA):
+            fase = "login"
+    return saida
+
+def _importtime(stderr):
+    """{módulo raiz: segundos acumulados} a partir da saída de -X importtime."""
+    raizes = {}
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha.split("|")
+        if not nome.startswith("  "):          # só o primeiro nível
+            raizes[nome.strip()] = int(acumulado) / 1e6
+    return raizes
+
+def medir_partida(caminho=APP, python=sys.executable):
+    """Tempos por instrução, módulos carregados e tempo do interpretador vazio."""
+    caminho = Path(caminho)
+    t = time.perf_counter()
+    subprocess.run([python, "-c", "pass"], check=True)
+    interpretador = time.perf_counter() - t
+
+    instrucoes = imports_de_partida(caminho)
+    proc = subprocess.run([python, "-X", "importtime", "-c", _DRIVER, json.dumps(instrucoes)],
+                          cwd=caminho.parent, capture_output=True, text=True, check=True)
+    dados = json.loads(proc.stdout)
+    return {"interpretador": interpretador, "imports": dados["imports"],
+            "novos": dados["novos"], "raizes": _importtime(proc.stderr)}
+
+def _do_streamlit(instrucao):
+    return instrucao.split()[1].split(".")[0] == "streamlit"
+
+def tempos(medida):
+    """{'piso': import do streamlit, 'senha'/'login': imports do app em cada fase}."""
+    saida = {"piso": 0.0, "senha": 0.0, "login": 0.0}
+    for fase, instrucao, seg in medida["imports"]:
+        saida["piso" if _do_streamlit(instrucao) else fase] += seg
+    return saida
+
+def verificar(medida, orcamento_senha, orcamento, proibidos=PROIBIDOS):
+    """
+    Lista de violações (texto). Os orçamentos não contam o piso do streamlit, e
+    módulo proibido só conta se vier de um import do app: o próprio streamlit
+    já carrega a base do plotly para o tema.
+    """
+    t = tempos(medida)
+    total = t["senha"] + t["login"]
+    problemas = []
+    if t["senha"] > orcamento_senha:
+        problemas.append(f"imports do app antes da senha: {t['senha']:.2f} s > {orcamento_senha:.2f} s")
+    if total > orcamento:
+        problemas.append(f"imports do app na partida: {total:.2f} s > {orcamento:.2f} s")
+    for instrucao, novos in medida["novos"].items():
+        if _do_streamlit(instrucao):
+            continue
+        carregados = {m.split(".")[0] for m in novos}
+        problemas += [f"'{m}' carregado na partida por `{' '.join(instrucao.split())[:40]}`"
+                      for m in proibidos if m in carregados]
+    return problemas
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m calculadora.partida", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--app", type=Path, default=APP)
+    ap.add_argument("--orcamento-senha", type=float, default=0.2,
+                    help="segundos de imports do app até a tela de senha, além do streamlit")
+    ap.add_argument("--orcamento", type=float, default=1.5,
+                    help="segundos de imports do app até a página completa, além do streamlit")
+    ap.add_argument("--detalhe", type=int, default=10, help="módulos mais pesados a listar")
+    args = ap.parse_args(argv)
+
+    medida = medir_partida(args.app)
+    print(f"{'interpretador':<58} {medida['interpretador']:>7.3f} s")
+    for fase, instrucao, seg in medida["imports"]:
+        print(f"[{fase:<5}] {' '.join(instrucao.split())[:50]:<50} {seg:>7.3f} s")
+    t = tempos(medida)
+    print(f"{'piso streamlit':<58} {t['piso']:>7.3f} s")
+    for fase in ("senha", "login"):
+        print(f"{'app ' + fase:<58} {t[fase]:>7.3f} s")
+    if args.detalhe:
+        print("\nmódulos mais pesados (acumulado):")
+        for nome, seg in sorted(medida["raizes"].items(), key=lambda x: -x[1])[:args.detalhe]:
+            print(f"  {nome:<40} {seg:>7.3f} s")
+
+    problemas = verificar(medida, args.orcamento_senha, args.orcamento)
+    for p in problemas:
+        print(f"ORÇAMENTO {p}", file=sys.stderr)
+    return 1 if problemas else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
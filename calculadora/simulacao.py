@@ -0,0 +1,301 @@
+"""
+Premissas e motor de simulação: cubo de volumes por (segmento, subcanal,
+ANOMES), taxas com fallback e simulação vetorizada em lote.
+Sem dependência de Streamlit.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from .base import FAMILIAS_KPI, normalize_text
+from .instrumentacao import medido
+
+# ====================== PARÂMETROS FIXOS ======================
+RETIDO_DICT = {"App":0.9169,"Bot":0.8835,"Web":0.9027}
+CR_SEGMENTO = {"Móvel":0.4947,"Residencial":0.4989}
+DEFAULT_TX_UU_CPF = 12.28
+
+def regra_retido_por_tribo(tribo):
+    if str(tribo).strip().lower() == "dma":
+        return RETIDO_DICT["Bot"]
+    return RETIDO_DICT.get(tribo, RETIDO_DICT["Web"])
+
+
+# ====================== FUNÇÕES DE LEITURA ======================
+def soma_kpi(df_scope, familia):
+    """Soma os valores de VOL_KPI das linhas da família de KPI informada."""
+    return df_scope.loc[df_scope["KPI_FAMILIA"] == familia, "VOL_KPI"].sum()
+
+
+class CuboKPI:
+    """
+    Volumes pré-agregados por (SEGMENTO_NORM, SUBCANAL_NORM, ANOMES).
+    `tabela` guarda vol_71, vol_41, vol_6 e a torre dominante (NM_TORRE mais
+    frequente) de cada chave; as consultas pontuais são O(1) via dicionário.
+    """
+    CHAVES = ["SEGMENTO_NORM", "SUBCANAL_NORM", "ANOMES"]
+    VOLUMES = FAMILIAS_KPI
+
+    @medido("cubo")
+    def __init__(self, df):
+        tabela = (df.groupby(self.CHAVES + ["KPI_FAMILIA"], observed=True, sort=True)["VOL_KPI"].sum()
+                    .unstack("KPI_FAMILIA")
+                    .reindex(columns=self.VOLUMES, fill_value=0.0)
+                    .fillna(0.0).astype(float))
+        tabela.columns = list(tabela.columns)
+        todas = df[self.CHAVES].drop_duplicates().set_index(self.CHAVES).index
+        tabela = tabela.reindex(todas, fill_value=0.0).sort_index()
+
+        torres = (df.dropna(subset=["NM_TORRE"])
+                    .groupby(self.CHAVES + ["NM_TORRE"], observed=True, sort=False).size()
+                    .reset_index(name="n")
+                    .sort_values("n", ascending=False, kind="stable")
+                    .drop_duplicates(self.CHAVES)
+                    .set_index(self.CHAVES)["NM_TORRE"])
+        tabela["NM_TORRE"] = torres.reindex(tabela.index)
+        self.tabela = tabela
+        self._idx = dict(zip(tabela.index, tabela.itertuples(index=False, name=None)))
+
+        # universo de subcanais por segmento (nomes originais, todos os meses)
+        pares = df[["SEGMENTO", "NM_SUBCANAL"]].dropna().drop_duplicates()
+        self._subcanais = {str(seg): sorted(g["NM_SUBCANAL"].astype(str))
+                           for seg, g in pares.groupby("SEGMENTO", observed=True)}
+        # índices dos filtros: valores distintos e nomes já normalizados
+        self.segmentos = sorted(str(s) for s in df["SEGMENTO"].dropna().unique())
+        self.meses = sorted(int(a) for a in df["ANOMES"].unique())
+        self._norm = {}
+        for col, col_norm in (("SEGMENTO", "SEGMENTO_NORM"), ("NM_SUBCANAL", "SUBCANAL_NORM")):
+            nomes = df[[col, col_norm]].dropna().drop_duplicates()
+            self._norm.update(zip(nomes[col].astype(str), nomes[col_norm].astype(str)))
+
+    def subcanais(self, segmento):
+        """Subcanais (nomes originais, ordenados) que aparecem no segmento."""
+        return self._subcanais.get(str(segmento), [])
+
+    def normalizar(self, nome):
+        """normalize_text com memo dos nomes que existem na base."""
+        n = self._norm.get(nome)
+        if n is None:
+            n = self._norm[nome] = normalize_text(nome)
+        return n
+
+    def chave(self, segmento, subcanal, anomes):
+        return (self.normalizar(segmento), self.normalizar(subcanal), int(anomes))
+
+    def volumes(self, segmento, subcanal, anomes):
+        """(vol_71, vol_41, vol_6) da chave; zeros se a combinação não existir."""
+        linha = self._idx.get(self.chave(segmento, subcanal, anomes))
+        return (0.0, 0.0, 0.0) if linha is None else linha[:3]
+
+    def tribo(self, segmento, subcanal, anomes):
+        """Torre dominante da chave ou 'Indefinido'."""
+        linha = self._idx.get(self.chave(segmento, subcanal, anomes))
+        if linha is None or pd.isna(linha[3]):
+            return "Indefinido"
+        return linha[3]
+
+
+def get_volumes(cubo, segmento, subcanal, anomes):
+    """Consulta no cubo os volumes principais do segmento, subcanal e ANOMES."""
+    vol_71, vol_41, vol_6 = cubo.volumes(segmento, subcanal, anomes)
+    return float(vol_71), float(vol_41), float(vol_6)
+
+
+def get_tribo(cubo, segmento, subcanal, anomes):
+    """Tribo (torre) do subcanal no ANOMES, consultada no cubo."""
+    return cubo.tribo(segmento, subcanal, anomes)
+
+
+def tx_trn_por_acesso(vol_71, vol_6):
+    """
+    Calcula a taxa de Transações ÷ Acessos, com proteção contra divisões por zero.
+    Mantém valor mínimo de 1.0 para evitar distorções ou erro de divisão.
+    """
+    if vol_71 <= 0 or vol_6 <= 0:
+        
+        return 1.75
+    return max(vol_71 / vol_6, 1.0)
+
+
+
+def tx_uu_por_cpf(vol_71, vol_41):
+    """
+    Calcula a taxa Transações ÷ Usuários Únicos CPF.
+    Aplica fallback padrão (DEFAULT_TX_UU_CPF) caso haja zeros ou valores inválidos.
+    """
+    # Evita divisões por zero e garante valor mínimo
+    if vol_71 <= 0 or vol_41 <= 0:
+        return DEFAULT_TX_UU_CPF
+
+    try:
+        taxa = vol_71 / vol_41
+        # Se taxa for absurda ou negativa, retorna padrão
+        if not np.isfinite(taxa) or taxa <= 0:
+            return DEFAULT_TX_UU_CPF
+        return taxa
+    except ZeroDivisionError:
+        return DEFAULT_TX_UU_CPF
+
+# ====================== SIMULAÇÃO EM LOTE ======================
+COLUNAS_LOTE = ["Subcanal", "Tribo", "Tx Trans/Acessos", "Tx UU/CPF", "% Retido", "% CR",
+                "Volume Acessos", "MAU (CPF)", "Volume CR Evitado"]
+
+def tx_trn_por_acesso_vet(vol_71, vol_6):
+    """Versão vetorizada de tx_trn_por_acesso (mesmo fallback 1.75 e piso 1.0)."""
+    vol_71, vol_6 = np.asarray(vol_71, dtype=float), np.asarray(vol_6, dtype=float)
+    ok = (vol_71 > 0) & (vol_6 > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ok, np.maximum(vol_71 / np.where(ok, vol_6, 1.0), 1.0), 1.75)
+
+def tx_uu_por_cpf_vet(vol_71, vol_41):
+    """Versão vetorizada de tx_uu_por_cpf (fallback DEFAULT_TX_UU_CPF)."""
+    vol_71, vol_41 = np.asarray(vol_71, dtype=float), np.asarray(vol_41, dtype=float)
+    ok = (vol_71 > 0) & (vol_41 > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa = vol_71 / np.where(ok, vol_41, 1.0)
+    ok &= np.isfinite(taxa) & (taxa > 0)
+    return np.where(ok, taxa, DEFAULT_TX_UU_CPF)
+
+COLUNAS_COEF = ["Segmento", "Subcanal", "ANOMES", "Tribo", "tx_trn_acc", "tx_uu_cpf", "retido", "cr"]
+
+@medido("coeficientes")
+def coeficientes(cubo, segmentos, subcanais, anomes):
+    """
+    Premissas linha a linha (tribo, taxas, %retido e %CR) para listas
+    alinhadas de segmento, subcanal e ANOMES.
+    """
+    segs = np.asarray(segmentos, dtype=object)
+    subs = np.asarray(subcanais, dtype=object)
+    mes = np.asarray(anomes).astype(int)
+    if segs.size == 0:
+        return pd.DataFrame(columns=COLUNAS_COEF)
+
+    norm = {v: normalize_text(v) for v in set(segs) | set(subs)}
+    idx = pd.MultiIndex.from_arrays([[norm[v] for v in segs], [norm[v] for v in subs], mes])
+    vols = cubo.tabela.reindex(idx)
+    v71, v41, v6 = (vols[c].fillna(0.0).to_numpy(dtype=float) for c in CuboKPI.VOLUMES)
+    tribos = vols["NM_TORRE"].astype(object).where(vols["NM_TORRE"].notna(), "Indefinido").to_numpy()
+
+    retido = pd.Series(tribos).map({t: regra_retido_por_tribo(t) for t in set(tribos)}).to_numpy(dtype=float)
+    cr = pd.Series(segs).map({s: CR_SEGMENTO.get(s, 0.50) for s in set(segs)}).to_numpy(dtype=float)
+    return pd.DataFrame({
+        "Segmento": segs, "Subcanal": subs, "ANOMES": mes, "Tribo": tribos,
+        "tx_trn_acc": tx_trn_por_acesso_vet(v71, v6),
+        "tx_uu_cpf": tx_uu_por_cpf_vet(v71, v41),
+        "retido": retido, "cr": cr,
+    })
+
+def coeficientes_lote(cubo, segmentos, anomes):
+    """
+    Premissas por (Segmento, Subcanal, ANOMES) para todos os subcanais de cada
+    segmento. Aceita escalares ou listas.
+    """
+    pares = [(seg, sub) for seg in np.atleast_1d(segmentos) for sub in cubo.subcanais(seg)]
+    meses = np.atleast_1d(anomes).astype(int)
+    if not pares or meses.size == 0:
+        return pd.DataFrame(columns=COLUNAS_COEF)
+    return coeficientes(
+        cubo,
+        np.repeat(np.array([p[0] for p in pares], dtype=object), meses.size),
+        np.repeat(np.array([p[1] for p in pares], dtype=object), meses.size),
+        np.tile(meses, len(pares)),
+    )
+
+def _vetores(coef):
+    return tuple(coef[c].to_numpy(dtype=float) for c in ("tx_trn_acc", "tx_uu_cpf", "retido", "cr"))
+
+def _colunas_volume(tx, tx_uu, ret, cr, v):
+    """Colunas que dependem do volume: tudo é v × coeficiente do subcanal (com piso)."""
+    v = np.asarray(v, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_acc = np.where(tx > 0, v / tx, 0.0)
+        mau = np.where(tx_uu > 0, v / tx_uu, 0.0)
+    est = np.floor(vol_acc * cr * ret + 1e-9)
+    return {
+        "Volume Transações": np.broadcast_to(v, tx.shape).copy(),
+        "Volume Acessos": vol_acc.astype(np.int64),
+        "MAU (CPF)": mau.astype(np.int64),
+        "Volume CR Evitado": est.astype(np.int64),
+    }
+
+def _resultado(coef, v):
+    """Aplica o volume v (alinhado linha a linha com coef) e monta as colunas de saída."""
+    tx, tx_uu, ret, cr = _vetores(coef)
+    por_volume = _colunas_volume(tx, tx_uu, ret, cr, v)
+    return coef[["Segmento", "ANOMES", "Subcanal", "Tribo"]].reset_index(drop=True).assign(**{
+        "Volume Transações": por_volume.pop("Volume Transações"),
+        "Tx Trans/Acessos": np.round(tx, 2),
+        "Tx UU/CPF": np.round(tx_uu, 2),
+        "% Retido": np.round(ret * 100, 2),
+        "% CR": np.round(cr * 100, 2),
+        **por_volume,
+    })
+
+def aplicar_volumes(coef, volumes):
+    """Aplica um ou mais volumes de transações sobre a tabela de premissas."""
+    vols = np.atleast_1d(volumes).astype(float)
+    linhas = np.tile(np.arange(len(coef)), vols.size)
+    return _resultado(coef.iloc[linhas], np.repeat(vols, len(coef)))
+
+def simular_lote(cubo, segmentos, anomes, volumes):
+    """
+    Simulação de todos os subcanais em uma passada vetorizada. Segmentos, meses
+    e volumes podem ser escalares ou listas: o resultado cobre a combinação
+    segmento × mês × volume, uma linha por subcanal.
+    """
+    return aplicar_volumes(coeficientes_lote(cubo, segmentos, anomes), volumes)
+
+def simular_cenarios(cubo, segmentos, subcanais, anomes, volumes):
+    """Simula cenários avulsos: listas alinhadas de segmento, subcanal, ANOMES e volume."""
+    return _resultado(coeficientes(cubo, segmentos, subcanais, anomes), volumes)
+
+# ====================== CACHE DE PREMISSAS ======================
+class CacheCoeficientes:
+    """
+    LRU de premissas por (versão da base, segmento, ANOMES).
+
+    Guarda a tabela já montada (sem as colunas de volume) e os vetores de
+    coeficientes de cada subcanal; trocar o volume custa só as contas
+    vetorizadas de `_colunas_volume`. Seguro para uso entre threads.
+    """
+
+    def __init__(self, maximo=64):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = self.faltas = 0
+
+    def premissas(self, cubo, versao, segmento, anomes):
+        """(tabela base, vetores) do cenário; calcula e guarda na primeira vez."""
+        chave = (versao, str(segmento), int(anomes))
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item
+        coef = coeficientes_lote(cubo, segmento, anomes)
+        item = (_resultado(coef, 0.0), _vetores(coef))
+        with self._lock:
+            self.faltas += 1
+            self._itens[chave] = item
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return item
+
+    @medido("simular_lote")
+    def simular(self, cubo, versao, segmento, anomes, volume):
+        """Mesmo resultado de simular_lote(cubo, segmento, anomes, volume) para um volume."""
+        tabela, vetores = self.premissas(cubo, versao, segmento, anomes)
+        return tabela.assign(**_colunas_volume(*vetores, float(volume)))
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.acertos = self.faltas = 0
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,128 @@
+"""
+Gerador de bases sintéticas no formato da "Tabela Performance", para medir
+desempenho em escalas maiores que a amostra de base/.
+
+`escala=1` reproduz as cardinalidades da amostra (56 subcanais em 2
+segmentos, 24 meses, ~7.7 mil linhas); a escala multiplica o número de
+subcanais, e com ele as linhas. Os nomes de KPI variam entre as grafias que
+aparecem nas versões da planilha, há linhas de meta (descartadas no preparo)
+e SEGMENTO vazio (fórmula quebrada), como na planilha real.
+
+    from calculadora.sintetico import gerar_base, gerar_planilha
+    df = gerar_base(escala=100)            # DataFrame com as colunas da aba
+    xlsx = gerar_planilha(gerar_base(10))  # bytes do .xlsx
+"""
+
+import numpy as np
+import pandas as pd
+
+from .base import ABA_BASE
+
+COLUNAS_PLANILHA = ["NM_PILAR", "NM_TORRE", "NM_KPI", "NM_CANAL", "NM_SUBCANAL", "NM_CATEGORIA",
+                    "ANOMES", "TP_META", "VOL_KPI", "NM_TIPO", "SEGMENTO", "Subcanal1"]
+SEGMENTOS = {"Móvel": 36, "Residencial": 20}                    # subcanais por segmento na amostra
+TORRES = {"Bot": 0.44, "App": 0.25, "Web": 0.24, "Dma": 0.07}    # participação nas linhas
+CANAIS = ["Alexa", "App Minha Claro", "WhatsApp", "Site", "URA", "Chat", "Portal", "Ecommerce"]
+# grafias de cada família; a primeira é a da amostra
+KPIS = {
+    "vol_71": ["transacoes", "7.1 - Transações"],
+    "vol_6": ["acessos", "6 - Acessos Usuários"],
+    "vol_41": ["usuarios_unicos_cpf", "4.1 - Usuários Únicos (CPF)"],
+}
+KPIS_RETIDO = ["2 - Retido Digital 72h - Apps", "2 - Retido Digital 72h - Bot", "2 - Retido Digital 72h - Web"]
+LIMITE_LINHAS_XLSX = 1_048_575
+
+def _meses(n, inicio=202401):
+    ano, mes = divmod(inicio, 100)
+    total = ano * 12 + mes - 1 + np.arange(n)
+    return (total // 12) * 100 + total % 12 + 1
+
+def gerar_base(escala=1, meses=24, semente=0, frac_meta=0.10, frac_segmento_ref=0.01):
+    """
+    DataFrame com as colunas da aba (textos como Categorical). Determinístico
+    para a mesma semente.
+    """
+    rng = np.random.default_rng(semente)
+    n_seg = {s: max(1, round(n * escala)) for s, n in SEGMENTOS.items()}
+    n_sub = sum(n_seg.values())
+    seg_sub = np.repeat(np.arange(len(n_seg)), list(n_seg.values()))
+    torres = list(TORRES)
+    torre_sub = rng.choice(len(torres), n_sub, p=list(TORRES.values()))
+    canal_sub = rng.integers(0, len(CANAIS), n_sub)
+    grafia_sub = (rng.random(n_sub) < 0.2).astype(int)        # 20% usa a grafia "numerada"
+    nomes_seg = list(n_seg)
+    nomes_sub = [f"{CANAIS[c]} {i} - {nomes_seg[s]}" for i, (c, s) in enumerate(zip(canal_sub, seg_sub))]
+
+    # uma linha de transações por categoria; acessos e UU CPF nem sempre existem
+    anomes = _meses(meses)
+    g_sub = np.repeat(np.arange(n_sub), meses)
+    g_mes = np.tile(anomes, n_sub)
+    n_g = g_sub.size
+    trn_grupo = rng.lognormal(10.0, 3.0, n_g) * (rng.random(n_g) > 0.2)
+    k = 1 + rng.poisson(3.2, n_g)
+    partes = rng.random(k.sum())
+    grupo = np.repeat(np.arange(n_g), k)
+    partes /= np.bincount(grupo, weights=partes)[grupo]
+    categoria = np.arange(k.sum()) - np.repeat(np.cumsum(k) - k, k)
+
+    tem_acc = rng.random(n_g) < 0.85
+    tem_uu = rng.random(n_g) < 0.70
+    blocos = [
+        # (grupos, família, volume, categoria)
+        (grupo, "vol_71", np.round(trn_grupo[grupo] * partes), categoria + 1),
+        (np.flatnonzero(tem_acc), "vol_6", np.round(trn_grupo[tem_acc] / rng.uniform(1.2, 6.0, tem_acc.sum())), 0),
+        (np.flatnonzero(tem_uu), "vol_41", np.round(trn_grupo[tem_uu] / rng.uniform(5.0, 20.0, tem_uu.sum())), 0),
+    ]
+    kpis = [n for grafias in KPIS.values() for n in grafias] + KPIS_RETIDO
+    cols = {c: [] for c in ("sub", "mes", "kpi", "vol", "cat")}
+    for grupos, familia, vol, cat in blocos:
+        sub = g_sub[grupos]
+        cols["sub"].append(sub)
+        cols["mes"].append(g_mes[grupos])
+        cols["kpi"].append(kpis.index(KPIS[familia][0]) + grafia_sub[sub])
+        cols["vol"].append(vol)
+        cols["cat"].append(np.broadcast_to(cat, sub.shape))
+    sub, mes, kpi = (np.concatenate(cols[c]) for c in ("sub", "mes", "kpi"))
+    vol, cat = np.concatenate(cols["vol"]), np.concatenate(cols["cat"])
+
+    # linhas de retido digital: uma por mês e torre, sem segmento
+    n_ret = len(KPIS_RETIDO) * meses
+    ret_sub = rng.integers(0, n_sub, n_ret)
+    sub = np.concatenate([sub, ret_sub])
+    mes = np.concatenate([mes, np.repeat(anomes, len(KPIS_RETIDO))])
+    kpi = np.concatenate([kpi, np.tile(np.arange(len(KPIS_RETIDO)) + len(kpis) - len(KPIS_RETIDO), meses)])
+    vol = np.concatenate([vol, rng.uniform(0.85, 0.95, n_ret)])
+    cat = np.concatenate([cat, np.zeros(n_ret, dtype=int)])
+    seg = np.concatenate([seg_sub[sub[:-n_ret]], np.full(n_ret, -1)])
+    seg[rng.random(seg.size) < frac_segmento_ref] = -1     # VLOOKUP com #REF! → vazio
+
+    n = sub.size
+    meta = rng.random(n) < frac_meta
+    ordem = np.lexsort((cat, mes, kpi, sub))
+    sub, mes, kpi, vol, cat, seg, meta = (a[ordem] for a in (sub, mes, kpi, vol, cat, seg, meta))
+
+    def categorico(codigos, categorias):
+        return pd.Categorical.from_codes(np.asarray(codigos, dtype=np.int32), categorias)
+
+    n_cat = int(cat.max()) + 1
+    return pd.DataFrame({
+        "NM_PILAR": categorico(np.zeros(n), ["1 - Engajamento"]),
+        "NM_TORRE": categorico(torre_sub[sub], torres),
+        "NM_KPI": categorico(kpi, kpis),
+        "NM_CANAL": categorico(canal_sub[sub], CANAIS),
+        "NM_SUBCANAL": categorico(sub, nomes_sub),
+        "NM_CATEGORIA": categorico(cat - 1, [f"Categoria {i}" for i in range(1, n_cat)]),
+        "ANOMES": mes.astype(np.int64),
+        "TP_META": categorico(meta, ["Real", "Meta"]),
+        "VOL_KPI": vol.astype(float),
+        "NM_TIPO": categorico(np.zeros(n), ["Volume"]),
+        "SEGMENTO": categorico(seg, nomes_seg),
+        "Subcanal1": categorico(np.zeros(n), ["#REF!"]),
+    }, columns=COLUNAS_PLANILHA)
+
+def gerar_planilha(df):
+    """Bytes de um .xlsx com a aba "Tabela Performance" contendo `df`."""
+    from .exportacao import exportar_excel
+    if len(df) > LIMITE_LINHAS_XLSX:
+        raise ValueError(f"{len(df):,} linhas não cabem numa aba do Excel ({LIMITE_LINHAS_XLSX:,})")
+    return exportar_excel({ABA_BASE: df})
@@ -0,0 +1,121 @@
+"""FonteRemota contra um servidor HTTP local: 200, 304 condicional e rede fora."""
+
+import json, os, threading, time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from calculadora.base import hash_conteudo
+from calculadora.fonte import FonteRemota
+
+class _Servidor:
+    """Serve `conteudo` com ETag/Last-Modified e responde 304 a pedidos condicionais."""
+
+    def __init__(self):
+        self.conteudo, self.etag, self.modificado = b"v1", '"v1"', formatdate(1_700_000_000, usegmt=True)
+        self.pedidos = []
+        self.atraso = 0.0
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.pedidos.append(dict(self.headers))
+                time.sleep(servidor.atraso)
+                if self.headers.get("If-None-Match") == servidor.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", servidor.etag)
+                self.send_header("Last-Modified", servidor.modificado)
+                self.send_header("Content-Length", str(len(servidor.conteudo)))
+                self.end_headers()
+                self.wfile.write(servidor.conteudo)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.http.server_port}/base.xlsx"
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    def parar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+@pytest.fixture
+def servidor():
+    s = _Servidor()
+    yield s
+    s.parar()
+
+def test_download_e_304(servidor, tmp_path):
+    fonte = FonteRemota(servidor.url, diretorio=tmp_path, timeout=5)
+    assert not fonte.disponivel()
+    assert fonte.revalidar() is True
+    assert fonte.conteudo() == b"v1"
+    assert fonte.meta["etag"] == '"v1"' and fonte.meta["origem"] == "remoto"
+
+    assert fonte.revalidar() is False
+    assert servidor.pedidos[-1].get("If-None-Match") == '"v1"'
+    assert servidor.pedidos[-1].get("If-Modified-Since") == servidor.modificado
+    assert fonte.conteudo() == b"v1"
+    # idade vem do Last-Modified do servidor
+    assert abs(fonte.idade() - (time.time() - 1_700_000_000)) < 5
+
+def test_conteudo_novo_troca_a_copia(servidor, tmp_path):
+    fonte = FonteRemota(servidor.url, diretorio=tmp_path, timeout=5)
+    fonte.revalidar()
+    versao = fonte.versao
+    servidor.conteudo, servidor.etag = b"v2", '"v2"'
+    assert fonte.revalidar() is True
+    assert fonte.conteudo() == b"v2" and fonte.versao != versao
+    # outra instância (outro processo) enxerga a cópia nova
+    assert FonteRemota(servidor.url, diretorio=tmp_path).versao == fonte.versao
+
+def test_rede_fora_mantem_a_copia(servidor, tmp_path, monkeypatch):
+    monkeypatch.setenv("CALC_PERF_LOG", str(tmp_path / "desempenho.jsonl"))
+    fonte = FonteRemota(servidor.url, diretorio=tmp_path, timeout=5)
+    fonte.revalidar()
+    servidor.parar()
+    fonte.revalidar_em_segundo_plano(forcar=True).join(10)
+    assert fonte.ultimo_erro is not None
+    assert fonte.conteudo() == b"v1"
+
+def test_revalidacao_em_segundo_plano_grava_o_download(servidor, tmp_path, monkeypatch):
+    log = tmp_path / "desempenho.jsonl"
+    monkeypatch.setenv("CALC_PERF_LOG", str(log))
+    fonte = FonteRemota(servidor.url, diretorio=tmp_path, timeout=5)
+    fonte.revalidar_em_segundo_plano(forcar=True).join(10)
+    linha = json.loads(log.read_text().splitlines()[-1])
+    assert linha["tipo"] == "revalidacao" and linha["mudou"] is True and linha["erro"] is None
+    assert [e["etapa"] for e in linha["etapas"]] == ["download"]
+
+def test_semente_durante_revalidacao_em_segundo_plano(servidor, tmp_path, monkeypatch):
+    monkeypatch.setenv("CALC_PERF_LOG", str(tmp_path / "desempenho.jsonl"))
+    semente = tmp_path / "semente.xlsx"
+    semente.write_bytes(b"semente" * 100_000)
+    servidor.conteudo = b"remoto" * 100_000
+    for i in range(40):
+        servidor.atraso = (i % 20) * 0.0005  # varia quem grava primeiro
+        diretorio = tmp_path / f"fonte{i}"
+        fonte = FonteRemota(servidor.url, diretorio=diretorio, semente=semente, timeout=5)
+        t = fonte.revalidar_em_segundo_plano(forcar=True)
+        assert fonte.conteudo() in (semente.read_bytes(), servidor.conteudo)
+        t.join(10)
+        assert fonte.ultimo_erro is None
+        assert fonte.conteudo() == servidor.conteudo
+        meta = json.loads((diretorio / fonte._arquivo_meta.name).read_text())
+        assert meta["versao"] == hash_conteudo(servidor.conteudo) == fonte.versao
+        assert not list(diretorio.glob("*.tmp"))
+
+def test_semente_usa_a_data_do_arquivo(tmp_path):
+    semente = tmp_path / "semente.xlsx"
+    semente.write_bytes(b"semente")
+    dias = 3 * 86400
+    os.utime(semente, (time.time() - dias, time.time() - dias))
+    fonte = FonteRemota("http://127.0.0.1:9/base.xlsx", diretorio=tmp_path / "fonte", semente=semente)
+    assert fonte.conteudo() == b"semente"
+    assert fonte.meta["origem"] == "semente"
+    assert abs(fonte.idade() - dias) < 5